@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db
+from app.schemas.auth import CurrentUser
+from app.schemas.ticket import ASSIGNED_TICKET_ADAPTER, ASSIGNED_TICKET_LIST_ADAPTER
+from app.services.agent_queue import agent_queue
+from app.utils.config import settings
+from app.utils.dependencies import require_agent
+from app.utils.responses import envelope, dump_models
+from app.utils import constants as msg
+from uuid import UUID
+import logging
+
+router = APIRouter(prefix="/agent", tags=["agent"])
+logger = logging.getLogger(__name__)
+
+@router.post("/tickets/claim")
+async def claim_tickets(
+    limit: int = Query(1, ge=1, le=settings.AGENT_CLAIM_MAX),
+    db: AsyncSession = Depends(get_db),
+    current_agent: CurrentUser = Depends(require_agent)
+):
+    """
+    Take the next `limit` tickets from the work queue, oldest first.
+
+    Each ticket is leased to the agent until `lease_expires_at`; renew the
+    lease while working on it, or it is handed to another agent. An empty
+    list means the queue is empty.
+    """
+    try:
+        tickets = await agent_queue.claim(db, current_agent.id, limit)
+        return envelope(status.HTTP_200_OK, msg.TICKETS_CLAIMED, dump_models(ASSIGNED_TICKET_LIST_ADAPTER, tickets))
+    except Exception as e:
+        logger.error(f"Claiming tickets failed: {e}")
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
+
+@router.post("/tickets/{ticket_id}/renew")
+async def renew_lease(
+    ticket_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_agent: CurrentUser = Depends(require_agent)
+):
+    """
+    Extend the lease on a claimed ticket.
+    """
+    return await _leased_action(agent_queue.renew, ticket_id, db, current_agent, msg.LEASE_RENEWED)
+
+@router.post("/tickets/{ticket_id}/release")
+async def release_ticket(
+    ticket_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_agent: CurrentUser = Depends(require_agent)
+):
+    """
+    Give a claimed ticket back to the work queue.
+    """
+    return await _leased_action(agent_queue.release, ticket_id, db, current_agent, msg.TICKET_RELEASED)
+
+@router.post("/tickets/{ticket_id}/resolve")
+async def resolve_ticket(
+    ticket_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_agent: CurrentUser = Depends(require_agent)
+):
+    """
+    Mark a claimed ticket as resolved.
+    """
+    return await _leased_action(agent_queue.resolve, ticket_id, db, current_agent, msg.TICKET_RESOLVED)
+
+
+async def _leased_action(action, ticket_id: UUID, db: AsyncSession, agent: CurrentUser, message: str):
+    try:
+        ticket = await action(db, ticket_id, agent.id)
+        if ticket is None:
+            # Unknown ticket, never claimed, or the lease expired and was taken over
+            return envelope(status.HTTP_409_CONFLICT, msg.LEASE_NOT_HELD)
+        return envelope(status.HTTP_200_OK, message, dump_models(ASSIGNED_TICKET_ADAPTER, ticket))
+    except Exception as e:
+        logger.error(f"Updating ticket lease failed: {e}")
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
@@ -0,0 +1,148 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sse_starlette import EventSourceResponse
+from app.db.models.ticket import Ticket
+from app.db.models.user import AGENT_ROLE
+from app.db.session import get_db, SessionLocal
+from app.schemas.auth import CurrentUser
+from app.services.events import event_broker, Subscription
+from app.services.ticket_cache import ticket_cache
+from app.utils.config import settings
+from app.utils.dependencies import get_current_user
+from app.utils.responses import envelope
+from app.utils import constants as msg
+from typing import Optional
+from uuid import UUID
+import asyncio
+import logging
+
+router = APIRouter(prefix="/events", tags=["events"])
+logger = logging.getLogger(__name__)
+
+async def _subscribe(
+    db: AsyncSession,
+    user: CurrentUser,
+    ticket_id: Optional[UUID],
+    last_event_id: Optional[str],
+) -> Optional[Subscription]:
+    """
+    Subscribe `user` to their own events, or to one ticket's. Agents may
+    follow any ticket. None when the ticket is not accessible.
+    """
+    if ticket_id is None:
+        return event_broker.subscribe(user_id=user.id, last_event_id=last_event_id)
+    if user.role == AGENT_ROLE:
+        if await db.get(Ticket, ticket_id) is None:
+            return None
+        return event_broker.subscribe(ticket_id=ticket_id, last_event_id=last_event_id)
+    if not await ticket_cache.get_owned(db, ticket_id, user.id):
+        return None
+    return event_broker.subscribe(user_id=user.id, ticket_id=ticket_id, last_event_id=last_event_id)
+
+@router.get("")
+async def stream_events(
+    ticket_id: Optional[UUID] = None,
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Server-Sent Events stream of ticket.created, ticket.updated and
+    message.created events for the current user's tickets (or, with
+    `ticket_id`, for one ticket), replacing polling.
+
+    Reconnecting clients send Last-Event-ID and receive the events they
+    missed; a `reset` event means too much was missed and state should be
+    reloaded. Slow clients are disconnected after an `overflow` event and
+    resume the same way.
+    """
+    try:
+        subscription = await _subscribe(db, current_user, ticket_id, last_event_id)
+        if subscription is None:
+            return envelope(status.HTTP_404_NOT_FOUND, msg.TICKET_NOT_FOUND)
+        # Hand the pooled connection back; the stream may stay open for hours
+        await db.close()
+        return EventSourceResponse(_relay(subscription), ping=settings.EVENTS_HEARTBEAT_SECONDS)
+    except Exception as e:
+        logger.error(f"Subscribing to events failed: {e}")
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
+
+async def _relay(subscription: Subscription):
+    try:
+        if subscription.reset:
+            yield {"event": "reset", "data": ""}
+        async for event in subscription:
+            yield {"id": event.id, "event": event.type, "data": event.payload()}
+        if subscription.overflowed:
+            yield {"event": "overflow", "data": ""}
+    finally:
+        subscription.close()
+
+@router.websocket("/ws")
+async def websocket_events(
+    websocket: WebSocket,
+    token: str = Query(...),
+    ticket_id: Optional[UUID] = None,
+    last_event_id: Optional[str] = None,
+):
+    """
+    The event stream over a WebSocket, for clients that cannot use SSE. The
+    access token is passed as `token` since browsers cannot set headers on
+    WebSockets. Each message is {"id", "event", "data"}; a "ping" event is
+    sent every EVENTS_HEARTBEAT_SECONDS while no other event is.
+    """
+    async with SessionLocal() as db:
+        try:
+            user = await get_current_user(token, db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        subscription = await _subscribe(db, user, ticket_id, last_event_id)
+    if subscription is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    sending = asyncio.Lock()
+    tasks = [
+        asyncio.create_task(_watch_disconnect(websocket, subscription)),
+        asyncio.create_task(_heartbeat(websocket, subscription, sending)),
+    ]
+    try:
+        if subscription.reset:
+            async with sending:
+                await websocket.send_json({"id": None, "event": "reset", "data": None})
+        async for event in subscription:
+            async with sending:
+                await websocket.send_text(
+                    '{"id":"%s","event":"%s","data":%s}' % (event.id, event.type, event.payload())
+                )
+        if subscription.overflowed:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscription.close()
+
+async def _watch_disconnect(websocket: WebSocket, subscription: Subscription) -> None:
+    """
+    Read the socket until the client goes away, then end the subscription;
+    without this a disconnect would only be noticed by the next send.
+    """
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        subscription.close()
+
+async def _heartbeat(websocket: WebSocket, subscription: Subscription, sending: asyncio.Lock) -> None:
+    try:
+        while True:
+            await asyncio.sleep(settings.EVENTS_HEARTBEAT_SECONDS)
+            async with sending:
+                await websocket.send_json({"id": None, "event": "ping", "data": None})
+    except Exception:
+        # The connection is gone
+        subscription.close()
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, status
+from app.services.warmup import database_reachable, readiness
+from app.utils.config import settings
+from app.utils.responses import envelope
+from app.utils import constants as msg
+
+router = APIRouter(tags=["health"])
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """
+    Liveness: the worker is running and its event loop responds. Depends
+    on nothing else, so a database outage does not get workers restarted.
+    """
+    return envelope(status.HTTP_200_OK, msg.ALIVE)
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """
+    Readiness: warm-up is over, shutdown has not begun and the database
+    answers. Returns 503 otherwise, so the worker gets no traffic.
+    """
+    checks = {"warmed_up": readiness.warmed_up, "draining": readiness.draining, "database": None}
+    if readiness.ready:
+        checks["database"] = await database_reachable(settings.READINESS_DB_TIMEOUT)
+    if readiness.ready and checks["database"]:
+        return envelope(status.HTTP_200_OK, msg.READY, checks)
+    return envelope(status.HTTP_503_SERVICE_UNAVAILABLE, msg.NOT_READY, checks)
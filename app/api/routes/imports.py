@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db
+from app.schemas.auth import CurrentUser
+from app.services.importer import BulkImporter, ndjson_lines
+from app.utils.config import settings
+from app.utils.dependencies import require_agent
+from app.utils.responses import envelope
+from app.utils import constants as msg
+import logging
+
+router = APIRouter(prefix="/import", tags=["import"])
+logger = logging.getLogger(__name__)
+
+@router.post("/")
+async def bulk_import(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_agent)
+):
+    """
+    Bulk load tickets and messages, e.g. from another helpdesk (agents only).
+
+    The body is NDJSON (optionally with Content-Encoding: gzip), one object
+    per line: {"type": "ticket", "id", "title", "description", "status",
+    "created_at", "user_id"} or {"type": "message", "id", "ticket_id",
+    "content", "is_ai", "created_at"}. Only title, ticket_id and content are
+    required; tickets default to the importing user, and rows without
+    created_at are dated in the order of the file (messages for a ticket
+    that already has messages go before its first one, so they do not
+    interleave with the live conversation). Messages must come after the
+    ticket they belong to, unless it already exists.
+
+    Rows are inserted in batches of IMPORT_BATCH_SIZE without generating AI
+    replies. Invalid rows are skipped and reported by line number; the
+    batches before an unexpected failure stay imported.
+    """
+    importer = BulkImporter(
+        db,
+        owner_id=current_user.id,
+        batch_size=settings.IMPORT_BATCH_SIZE,
+        max_errors=settings.IMPORT_MAX_REPORTED_ERRORS,
+        use_copy=settings.IMPORT_USE_COPY,
+    )
+    gzipped = request.headers.get("content-encoding", "").lower() == "gzip"
+    try:
+        result = await importer.run(ndjson_lines(request.stream(), gzipped))
+        return envelope(status.HTTP_200_OK, msg.IMPORT_COMPLETED, result.summary())
+    except Exception as e:
+        logger.error(f"Import failed: {e}")
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR, importer.result.summary())
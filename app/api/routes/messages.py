@@ -1,50 +1,102 @@
-from fastapi import APIRouter, Depends, status, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Query, status, Request
+from fastapi.responses import Response
 from sse_starlette import EventSourceResponse
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+import anyio
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, SessionLocal
 from app.db.models.ticket import Ticket
 from app.db.models.message import Message
-from app.db.models.user import User
-from app.schemas.message import MessageCreate
-from app.services.groq import get_groq_response
+from app.schemas.auth import CurrentUser
+from app.db.models.ai_job import AI_JOB_QUEUED, AI_JOB_RUNNING, AI_JOB_FAILED
+from app.schemas.message import MessageCreate, AIMode
+from app.schemas.ticket import MESSAGE_LIST_ADAPTER
+from app.services.groq import get_groq_response, stream_groq_response
+from app.services.llm_router import LLMError
+from app.services.ai_jobs import ai_job_queue, AIJobRequest, AIJobQueueFull
+from app.services.archiver import message_archiver
+from app.services.events import event_broker, message_data, MESSAGE_CREATED, TICKET_UPDATED
+from app.services.prompt_builder import prompt_builder
+from app.services.rate_limit import message_rate_limiter, llm_limiter, RateLimited, LLMBusy
+from app.services.ticket_cache import ticket_cache
+from app.utils.config import settings
 from app.utils.dependencies import get_current_user
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.responses import envelope, dump_page
 from app.utils import constants as msg
 import logging
+import math
+from collections import Counter
+from typing import List, Optional
 from uuid import UUID
 
 router = APIRouter(prefix="/tickets", tags=["tickets"])
 logger = logging.getLogger(__name__)
 
+# Tickets with a sync or streamed AI reply being generated in this process,
+# so GET /{ticket_id}/ai-response does not start a second one. Per worker
+# only: with several workers, a request routed to another worker is not
+# stopped by it (background replies are tracked in Ticket.ai_status instead)
+_replies_in_progress: Counter = Counter()
+
+def _reply_started(ticket_id: UUID) -> None:
+    _replies_in_progress[ticket_id] += 1
+
+def _reply_finished(ticket_id: UUID) -> None:
+    _replies_in_progress[ticket_id] -= 1
+    if _replies_in_progress[ticket_id] <= 0:
+        del _replies_in_progress[ticket_id]
+
 @router.post("/{ticket_id}/messages")
-def create_message(
+async def create_message(
     ticket_id: UUID,
     message_in: MessageCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    ai_mode: AIMode = AIMode.sync,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Add a message to a specific ticket (User & AI response).
+
+    With `ai_mode=stream` only the user message is stored and the AI reply is
+    generated token by token when the client opens GET /{ticket_id}/ai-response.
+    With `ai_mode=background` the request is answered with 202 and the reply is
+    generated by the AI job queue; progress is reported in the ticket's `ai_status`.
+
+    Users posting faster than their rate limit get 429, and sync requests that
+    find the AI at capacity get 503, both with a Retry-After header. When no AI
+    provider can answer, the user message is kept and 503 is returned; the
+    reply can then be streamed from GET /{ticket_id}/ai-response.
     """
+    slot_taken = False
+    reply_claimed = False
     try:
+        try:
+            await message_rate_limiter.check(current_user.id)
+        except RateLimited as e:
+            return _retry_later(status.HTTP_429_TOO_MANY_REQUESTS, msg.RATE_LIMITED, e.retry_after)
+
         # import pdb; pdb.set_trace()
         logger.info(f"Received message: {message_in}")
         # Check if ticket exists and belongs to current user
-        ticket = db.query(Ticket).filter(
-            Ticket.id == ticket_id,
-            Ticket.user_id == current_user.id
-        ).first()
-
-        if not ticket:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content={
-                    "success": False,
-                    "status_code": 404,
-                    "message": "Ticket not found",
-                    "data": None
-                }
-            )
+        cached = await ticket_cache.get_owned(db, ticket_id, current_user.id)
+
+        if not cached:
+            return envelope(status.HTTP_404_NOT_FOUND, "Ticket not found")
+        ticket = cached.ticket
+
+        if ai_mode == AIMode.sync:
+            # Claim an LLM slot before storing anything, so a rejected request
+            # does not leave an unanswered message behind
+            try:
+                await llm_limiter.acquire()
+            except LLMBusy as e:
+                return _retry_later(status.HTTP_503_SERVICE_UNAVAILABLE, msg.AI_BUSY, e.retry_after)
+            slot_taken = True
+            # Claimed before the user message is committed: from then on a
+            # GET /ai-response would otherwise see it unanswered
+            _reply_started(ticket.id)
+            reply_claimed = True
 
         # Save user's message
         user_msg = Message(
@@ -52,11 +104,51 @@ def create_message(
             ticket_id=ticket.id,
             is_ai=False
         )
+        if ai_mode == AIMode.background:
+            await _set_ai_status(db, ticket.id, AI_JOB_QUEUED)
         db.add(user_msg)
-        db.commit()
+        await db.commit()
+        await ticket_cache.invalidate(ticket.id)
+        await event_broker.publish(MESSAGE_CREATED, ticket.user_id, ticket.id, message_data(user_msg))
+
+        if ai_mode == AIMode.background:
+            await event_broker.publish(TICKET_UPDATED, ticket.user_id, ticket.id, {"ai_status": AI_JOB_QUEUED})
+            try:
+                await ai_job_queue.enqueue(AIJobRequest(ticket.id, user_msg.id))
+            except AIJobQueueFull:
+                await _set_ai_status(db, ticket.id, AI_JOB_FAILED)
+                await db.commit()
+                await ticket_cache.invalidate(ticket.id)
+                await event_broker.publish(TICKET_UPDATED, ticket.user_id, ticket.id, {"ai_status": AI_JOB_FAILED})
+                return envelope(status.HTTP_503_SERVICE_UNAVAILABLE, msg.AI_QUEUE_FULL)
 
-        # Get AI response and save it
-        ai_response = get_groq_response(message_in.content)
+            return envelope(
+                status.HTTP_202_ACCEPTED,
+                msg.MESSAGE_CREATED_AI_QUEUED,
+                {
+                    "user_message": user_msg.content,
+                    "ai_message": None,
+                    "ai_status": AI_JOB_QUEUED
+                }
+            )
+
+        if ai_mode == AIMode.stream:
+            return envelope(
+                status.HTTP_201_CREATED,
+                msg.MESSAGE_CREATED_AI_STREAM_PENDING,
+                {
+                    "user_message": user_msg.content,
+                    "ai_message": None
+                }
+            )
+
+        # Get AI response for the conversation so far and save it
+        conversation = await prompt_builder.build(db, ticket)
+        try:
+            ai_response = await get_groq_response(conversation)
+        except LLMError as e:
+            logger.error(f"AI response failed: {e}")
+            return _retry_later(status.HTTP_503_SERVICE_UNAVAILABLE, msg.AI_UNAVAILABLE, e.retry_after)
 
         ai_msg = Message(
             content=ai_response,
@@ -64,91 +156,231 @@ def create_message(
             is_ai=True
         )
         db.add(ai_msg)
-        db.commit()
-        db.refresh(ai_msg)
-
-        return JSONResponse(
-            status_code=status.HTTP_201_CREATED,
-            content={
-                "success": True,
-                "status_code": 201,
-                "message": "Message created and AI response generated",
-                "data": {
-                    "user_message": user_msg.content,
-                    "ai_message": ai_msg.content
-                }
+        await db.commit()
+        await db.refresh(ai_msg)
+        _reply_finished(ticket.id)
+        reply_claimed = False
+        await ticket_cache.invalidate(ticket.id)
+        await event_broker.publish(MESSAGE_CREATED, ticket.user_id, ticket.id, message_data(ai_msg))
+
+        return envelope(
+            status.HTTP_201_CREATED,
+            "Message created and AI response generated",
+            {
+                "user_message": user_msg.content,
+                "ai_message": ai_msg.content
             }
         )
 
     except Exception as e:
         logger.error(f"Message creation failed: {e}")
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "success": False,
-                "status_code": 500,
-                "message": msg.INTERNAL_SERVER_ERROR,
-                "data": None
-            }
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
+    finally:
+        if reply_claimed:
+            _reply_finished(ticket.id)
+        if slot_taken:
+            llm_limiter.release()
+
+@router.get("/{ticket_id}/messages")
+async def get_ticket_messages(
+    ticket_id: UUID,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    before: Optional[str] = None,
+    since: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get the message history of a ticket.
+
+    By default messages are returned newest first; pass the returned
+    `next_cursor` as `before` to page further back. For incremental polling
+    pass a cursor as `since` instead: messages created after it are returned
+    oldest first, and `next_cursor` is the cursor to poll with next time.
+    Archived messages are included as if they were never moved.
+    """
+    try:
+        # Check if ticket exists and belongs to current user
+        cached = await ticket_cache.get_owned(db, ticket_id, current_user.id)
+        if not cached:
+            return envelope(status.HTTP_404_NOT_FOUND, msg.TICKET_NOT_FOUND)
+
+        try:
+            if before and since:
+                raise ValueError("before and since cannot be combined")
+            before_key = decode_cursor(before) if before else None
+            since_key = decode_cursor(since) if since else None
+        except ValueError:
+            return envelope(status.HTTP_400_BAD_REQUEST, msg.INVALID_CURSOR)
+
+        key = tuple_(Message.created_at, Message.id)
+        query = select(Message).filter(Message.ticket_id == ticket_id)
+        if since_key:
+            query = query.filter(key > tuple_(*since_key)).order_by(Message.created_at, Message.id)
+        else:
+            if before_key:
+                query = query.filter(key < tuple_(*before_key))
+            query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+        # Fetch one extra row to know whether another page follows
+        messages = (await db.scalars(query.limit(limit + 1))).all()
+
+        # Merge in archived messages (see app.services.archiver) within the
+        # page, which ends at the last row fetched when that filled it
+        last_key = (messages[-1].created_at, messages[-1].id) if len(messages) > limit else None
+        archived = []
+        if message_archiver.may_have_archived(cached.ticket.created_at, since_key or last_key):
+            if since_key:
+                archived = await message_archiver.archived_messages(db, ticket_id, after=since_key, before=last_key)
+            else:
+                archived = await message_archiver.archived_messages(db, ticket_id, after=last_key, before=before_key)
+        if archived:
+            messages = sorted(
+                [*messages, *archived], key=lambda message: (message.created_at, message.id), reverse=not since_key
+            )[:limit + 1]
+
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        if since_key:
+            # Polling clients always get a cursor to resume from
+            next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id) if messages else since
+        else:
+            next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id) if has_more else None
+
+        return envelope(
+            status.HTTP_200_OK,
+            msg.MESSAGES_RETRIEVED_SUCCESSFULLY,
+            dump_page(MESSAGE_LIST_ADAPTER, messages, next_cursor)
         )
 
+    except Exception as e:
+        logger.error(f"Fetching messages failed: {e}")
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
+
 @router.get("/{ticket_id}/ai-response")
 async def stream_ai_response(
     ticket_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Stream AI response for a specific ticket using Server-Sent Events (SSE).
+
+    When the latest message still awaits its reply, the reply is generated
+    live; if a background job is already on it, 202 is returned instead, and
+    409 while another request of this worker generates it (the check is per
+    worker). Either way the reply arrives as a message.created event.
     """
     try:
         # Check if ticket exists and belongs to current user
-        ticket = db.query(Ticket).filter(
-            Ticket.id == ticket_id,
-            Ticket.user_id == current_user.id
-        ).first()
-
-        if not ticket:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content={
-                    "success": False,
-                    "status_code": 404,
-                    "message": "Ticket not found",
-                    "data": None
-                }
-            )
+        cached = await ticket_cache.get_owned(db, ticket_id, current_user.id)
 
-        # Fetch the last AI message for this ticket
-        ai_message = db.query(Message).filter(
-            Message.ticket_id == ticket_id,
-            Message.is_ai == True
-        ).order_by(Message.created_at.desc()).first()
-
-        if not ai_message:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content={
-                    "success": False,
-                    "status_code": 404,
-                    "message": "No AI response found",
-                    "data": None
-                }
-            )
+        if not cached:
+            return envelope(status.HTTP_404_NOT_FOUND, "Ticket not found")
+        ticket = cached.ticket
+
+        # A reply being generated in this process is delivered as a
+        # message.created event once saved; claim the ticket before looking
+        # at its messages, so concurrent requests cannot both generate one
+        if _replies_in_progress[ticket.id]:
+            return envelope(status.HTTP_409_CONFLICT, msg.AI_REPLY_IN_PROGRESS)
+        _reply_started(ticket.id)
+        streaming = False
+        try:
+            # Fetch the latest message for this ticket; a trailing user message
+            # means its AI reply has not been generated yet and is streamed live
+            latest_message = await db.scalar(select(Message).filter(
+                Message.ticket_id == ticket_id
+            ).order_by(Message.created_at.desc()).limit(1))
+            if not latest_message and message_archiver.may_have_archived(ticket.created_at):
+                # Every message of the ticket may have been archived
+                archived = await message_archiver.archived_messages(db, ticket_id)
+                latest_message = archived[-1] if archived else None
+
+            if not latest_message:
+                return envelope(status.HTTP_404_NOT_FOUND, "No AI response found")
+
+            if not latest_message.is_ai:
+                # A background job owns the reply (read fresh, the cached ticket may lag)
+                ai_status = await db.scalar(select(Ticket.ai_status).filter(Ticket.id == ticket.id))
+                if ai_status in (AI_JOB_QUEUED, AI_JOB_RUNNING):
+                    return envelope(status.HTTP_202_ACCEPTED, msg.AI_REPLY_QUEUED, {"ai_status": ai_status})
+
+                # The slot is held until the stream ends and released by _generate_ai_reply
+                try:
+                    await llm_limiter.acquire()
+                except LLMBusy as e:
+                    return _retry_later(status.HTTP_503_SERVICE_UNAVAILABLE, msg.AI_BUSY, e.retry_after)
+                try:
+                    conversation = await prompt_builder.build(db, ticket)
+                except Exception:
+                    llm_limiter.release()
+                    raise
+                streaming = True
+                return EventSourceResponse(_generate_ai_reply(ticket.id, ticket.user_id, conversation))
+        finally:
+            # Once streaming, _generate_ai_reply releases the claim after saving
+            if not streaming:
+                _reply_finished(ticket.id)
 
         async def event_stream():
-            yield f"data: {ai_message.content}\n\n"
+            yield {"data": latest_message.content}
 
         return EventSourceResponse(event_stream())
 
     except Exception as e:
         logger.error(f"Streaming AI response failed: {e}")
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "success": False,
-                "status_code": 500,
-                "message": msg.INTERNAL_SERVER_ERROR,
-                "data": None
-            }
-        )
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
+
+
+def _retry_later(status_code: int, message: str, retry_after: float) -> Response:
+    return envelope(status_code, message, headers={"Retry-After": str(max(math.ceil(retry_after), 1))})
+
+async def _set_ai_status(db: AsyncSession, ticket_id: UUID, ai_status: str) -> None:
+    await db.execute(update(Ticket).filter(Ticket.id == ticket_id).values(ai_status=ai_status))
+
+async def _save_ai_message(ticket_id: UUID, user_id: UUID, content: str) -> None:
+    """
+    Persist a streamed AI reply using a dedicated session, since the request
+    scoped session is already closed once the response body is streaming.
+    """
+    async with SessionLocal() as db:
+        ai_msg = Message(content=content, ticket_id=ticket_id, is_ai=True)
+        db.add(ai_msg)
+        await db.commit()
+    await ticket_cache.invalidate(ticket_id)
+    await event_broker.publish(MESSAGE_CREATED, user_id, ticket_id, message_data(ai_msg))
+
+async def _generate_ai_reply(ticket_id: UUID, user_id: UUID, conversation: List[dict]):
+    """
+    Relay Groq completion chunks as SSE events and store the assembled reply
+    once the stream ends, including when the client disconnects midway.
+    Releases the LLM slot and the ticket claim taken by stream_ai_response.
+    """
+    chunks = []
+    upstream = stream_groq_response(conversation)
+    try:
+        async for chunk in upstream:
+            chunks.append(chunk)
+            yield {"event": "token", "data": chunk}
+        yield {"event": "done", "data": ""}
+    except LLMError as e:
+        logger.error(f"Streaming AI response failed: {e}")
+        yield {"event": "error", "data": msg.AI_UNAVAILABLE}
+    except Exception as e:
+        logger.error(f"Streaming AI response failed: {e}")
+        yield {"event": "error", "data": msg.INTERNAL_SERVER_ERROR}
+    finally:
+        # Shielded so the upstream connection is released and the reply saved
+        # even when the generator is being cancelled by a client disconnect
+        with anyio.CancelScope(shield=True):
+            llm_limiter.release()
+            await upstream.aclose()
+            try:
+                if chunks:
+                    await _save_ai_message(ticket_id, user_id, "".join(chunks))
+            except Exception as e:
+                logger.error(f"Saving streamed AI response failed: {e}")
+            finally:
+                _reply_finished(ticket_id)
@@ -0,0 +1,90 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.db.session import engine
+from app.services.events import event_broker
+from app.services.groq import llm_router
+from app.services.password_hasher import password_hasher
+from app.services.prompt_builder import prompt_builder
+from app.services.rate_limit import llm_limiter
+from app.services.response_cache import response_cache
+from app.services.ticket_cache import ticket_cache
+from app.services.user_cache import user_cache
+from app.services.warmup import readiness
+from app.utils.metrics import registry
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _cache_counts() -> dict:
+    # (hits, misses, entries) per cache
+    counts = {
+        name: (cache.hits, cache.misses, len(cache))
+        for name, cache in {**user_cache.caches, "ticket": ticket_cache.cache, "prompt_history": prompt_builder.cache}.items()
+    }
+    stats = response_cache.stats
+    counts["response"] = (stats.exact_hits + stats.similar_hits, stats.misses, len(response_cache))
+    return counts
+
+
+def _hit_ratios() -> dict:
+    return {
+        (name,): hits / (hits + misses) if hits + misses else 0.0
+        for name, (hits, misses, _) in _cache_counts().items()
+    }
+
+
+def _pool_connections() -> dict:
+    pool = engine.sync_engine.pool
+    # NullPool (PgBouncer mode) keeps no connections of its own
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {("checked_out",): pool.checkedout(), ("idle",): pool.checkedin(), ("overflow",): max(pool.overflow(), 0)}
+
+
+registry.counter(
+    "cache_hits_total", "Lookups answered from the cache", ("cache",),
+    callback=lambda: {(name,): hits for name, (hits, _, _) in _cache_counts().items()},
+)
+registry.counter(
+    "cache_misses_total", "Lookups not answered from the cache", ("cache",),
+    callback=lambda: {(name,): misses for name, (_, misses, _) in _cache_counts().items()},
+)
+registry.gauge("cache_hit_ratio", "Share of lookups answered from the cache", ("cache",), callback=_hit_ratios)
+registry.gauge(
+    "cache_entries", "Entries currently held by the cache", ("cache",),
+    callback=lambda: {(name,): entries for name, (_, _, entries) in _cache_counts().items()},
+)
+registry.counter(
+    "response_cache_similar_hits_total", "Response cache hits from the similarity tier",
+    callback=lambda: {(): response_cache.stats.similar_hits},
+)
+registry.gauge("db_pool_connections", "Database pool connections by state", ("state",), callback=_pool_connections)
+registry.gauge(
+    "llm_slots", "Request-bound AI replies in progress and waiting for a slot", ("state",),
+    callback=lambda: {("in_use",): llm_limiter.in_use, ("waiting",): llm_limiter.waiting},
+)
+registry.gauge(
+    "llm_provider_circuit_open", "1 while a provider's circuit breaker keeps it out of rotation", ("provider",),
+    callback=lambda: {(entry["name"],): int(entry["circuit"] == "open") for entry in llm_router.snapshot()},
+)
+registry.gauge(
+    "password_hash_pending", "Hash/verify calls running or waiting for a pool process",
+    callback=lambda: {(): password_hasher.pending},
+)
+registry.gauge(
+    "event_subscriptions", "Open live event streams (SSE and WebSocket)", callback=lambda: {(): len(event_broker)}
+)
+registry.gauge(
+    "startup_seconds", "Seconds this worker spent importing the app and warming up", ("phase",),
+    callback=lambda: {(phase,): seconds for phase, seconds in readiness.timings.items()},
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Metrics of this worker process in the Prometheus text format.
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, status
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, Query, status
+from fastapi.responses import Response
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.db.models.ticket import Ticket
-from app.db.models.user import User
-from app.schemas.ticket import TicketCreate, TicketOut
+from app.db.models.user import AGENT_ROLE
+from app.schemas.auth import CurrentUser
+from app.schemas.ticket import TicketCreate, TICKET_LIST_ADAPTER
+from app.services.events import event_broker, TICKET_CREATED
+from app.services.search import ticket_search
+from app.services.ticket_cache import ticket_cache
+from app.utils.config import settings
 from app.utils.dependencies import get_current_user
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.responses import envelope, dump_models, dump_page
 from app.utils import constants as msg  # Importing message constants
+from typing import Optional
 from uuid import UUID
 import logging
 
@@ -18,10 +26,10 @@ router = APIRouter(prefix="/tickets", tags=["tickets"])
 logger = logging.getLogger(__name__)
 
 @router.post("/")
-def create_ticket(
+async def create_ticket(
     ticket_data: TicketCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Create a new support ticket for the logged-in user.
@@ -36,120 +44,134 @@ def create_ticket(
 
         # Save the new ticket to the database
         db.add(ticket)
-        db.commit()
-        db.refresh(ticket)
+        await db.commit()
+        await db.refresh(ticket)
+
+        # Cache the new ticket right away; clients usually read it next
+        cached = await ticket_cache.set(ticket)
+        await event_broker.publish(TICKET_CREATED, ticket.user_id, ticket.id, cached.ticket.model_dump())
 
         # Return success response with the created ticket data
-        return JSONResponse(
-            status_code=status.HTTP_201_CREATED,
-            content={
-                "success": True,
-                "status_code": 201,
-                "message": msg.TICKET_CREATED_SUCCESSFULLY,
-                "data": jsonable_encoder(TicketOut.model_validate(ticket, from_attributes=True))
-            }
+        return envelope(
+            status.HTTP_201_CREATED,
+            msg.TICKET_CREATED_SUCCESSFULLY,
+            cached.body,
+            headers={"ETag": cached.etag}
         )
 
     except Exception as e:
         # Log error and return internal server error response
         logger.error(f"Ticket creation failed: {e}")
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "success": False,
-                "status_code": 500,
-                "message": msg.INTERNAL_SERVER_ERROR,
-                "data": None
-            }
-        )
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
 
 
 @router.get("/")
-def get_user_tickets(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_user_tickets(
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    ticket_status: Optional[str] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
-    Get all support tickets created by the current user.
+    Get the support tickets created by the current user, newest first.
+
+    Results are keyset paginated on (created_at, id): pass the returned
+    `next_cursor` as `cursor` to fetch the following page. `status` filters
+    the tickets by status.
     """
     try:
-        # Retrieve all tickets for the logged-in user
-        tickets = db.query(Ticket).filter(Ticket.user_id == current_user.id).all()
-        
-        # Convert to serializable format
-        data = [jsonable_encoder(TicketOut.model_validate(ticket, from_attributes=True)) for ticket in tickets]
-
-        # Return success response with all ticket data
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content={
-                "success": True,
-                "status_code": 200,
-                "message": msg.TICKETS_RETRIEVED_SUCCESSFULLY,
-                "data": data
-            }
-        )
+        query = select(Ticket).filter(Ticket.user_id == current_user.id)
+        if ticket_status:
+            query = query.filter(Ticket.status == ticket_status)
+
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+            except ValueError:
+                return envelope(status.HTTP_400_BAD_REQUEST, msg.INVALID_CURSOR)
+            query = query.filter(tuple_(Ticket.created_at, Ticket.id) < tuple_(cursor_created_at, cursor_id))
+
+        # Fetch one extra row to know whether another page follows
+        query = query.order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(limit + 1)
+        tickets = (await db.scalars(query)).all()
+
+        next_cursor = None
+        if len(tickets) > limit:
+            tickets = tickets[:limit]
+            next_cursor = encode_cursor(tickets[-1].created_at, tickets[-1].id)
+
+        # Validate and serialize the whole page in one pass
+        data = dump_page(TICKET_LIST_ADAPTER, tickets, next_cursor)
+
+        # Return success response with the page of ticket data
+        return envelope(status.HTTP_200_OK, msg.TICKETS_RETRIEVED_SUCCESSFULLY, data)
     except Exception as e:
         # Log error and return internal server error response
         logger.error(f"Fetching tickets failed: {e}")
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "success": False,
-                "status_code": 500,
-                "message": msg.INTERNAL_SERVER_ERROR,
-                "data": None
-            }
-        )
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
+
+
+# Registered before /{ticket_id}, which would otherwise take "search" for an id
+@router.get("/search")
+async def search_tickets(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Search tickets by the words in their title, description and messages,
+    best matches first. Users search their own tickets, agents all tickets.
+    """
+    try:
+        user_id = None if current_user.role == AGENT_ROLE else current_user.id
+        tickets = await ticket_search.search(db, q, user_id, limit)
+        return envelope(status.HTTP_200_OK, msg.SEARCH_RESULTS_RETRIEVED, dump_models(TICKET_LIST_ADAPTER, tickets))
+    except Exception as e:
+        logger.error(f"Searching tickets failed: {e}")
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
 
 
 @router.get("/{ticket_id}")
-def get_ticket(
+async def get_ticket(
     ticket_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Get a specific ticket by its ID for the current user.
+
+    The response carries an ETag; polling clients sending it back in
+    If-None-Match get 304 Not Modified while the ticket is unchanged.
     """
     try:
-        # Fetch ticket by ID and ensure it belongs to the current user
-        ticket = db.query(Ticket).filter(
-            Ticket.id == ticket_id,
-            Ticket.user_id == current_user.id
-        ).first()
+        # Fetch ticket by ID (usually from the cache) and ensure it belongs to the current user
+        cached = await ticket_cache.get_owned(db, ticket_id, current_user.id)
 
         # If ticket not found, return 404 response
-        if not ticket:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content={
-                    "success": False,
-                    "status_code": 404,
-                    "message": msg.TICKET_NOT_FOUND,
-                    "data": None
-                }
-            )
+        if not cached:
+            return envelope(status.HTTP_404_NOT_FOUND, msg.TICKET_NOT_FOUND)
+
+        headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+        if if_none_match and _etag_matches(if_none_match, cached.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
         # Return ticket details
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content={
-                "success": True,
-                "status_code": 200,
-                "message": msg.TICKET_RETRIEVED_SUCCESSFULLY,
-                "data": jsonable_encoder(TicketOut.model_validate(ticket, from_attributes=True))
-            }
-        )
+        return envelope(status.HTTP_200_OK, msg.TICKET_RETRIEVED_SUCCESSFULLY, cached.body, headers=headers)
     except Exception as e:
         # Log and return server error
         logger.error(f"Fetching ticket failed: {e}")
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "success": False,
-                "status_code": 500,
-                "message": msg.INTERNAL_SERVER_ERROR,
-                "data": None
-            }
-        )
+        return envelope(status.HTTP_500_INTERNAL_SERVER_ERROR, msg.INTERNAL_SERVER_ERROR)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match holds "*" or a list of (possibly weak) entity tags, compared weakly
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
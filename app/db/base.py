@@ -2,3 +2,5 @@ from app.db.session import Base
 from app.db.models.user import User
 from app.db.models.ticket import Ticket
 from app.db.models.message import Message
+from app.db.models.ai_job import AIJob
+from app.db.models.message_archive import MessageArchive
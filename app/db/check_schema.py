@@ -0,0 +1,100 @@
+"""
+Compare the live database schema with the models.
+
+    python -m app.db.check_schema
+
+Reports a database that is not at the latest migration, tables, columns
+and indexes that differ from app.db.models (including the expression
+indexes autogenerate cannot compare) and, on PostgreSQL, INVALID indexes
+left by interrupted concurrent builds. Exits with status 1 on any finding.
+"""
+import asyncio
+import sys
+from typing import List
+
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import Column, ForeignKeyConstraint, inspect, text
+from sqlalchemy.engine import Connection
+
+from app.db.base import Base
+from app.db.migrations import alembic_config, compare_type, include_object_for
+from app.db.session import engine
+
+
+def _name(obj) -> str:
+    if isinstance(obj, ForeignKeyConstraint):
+        return f"{obj.table.name}({', '.join(obj.column_keys)}) -> {obj.referred_table.name}"
+    if isinstance(obj, Column):
+        return f"{obj.table.name}.{obj.name}"
+    return str(getattr(obj, "name", obj))
+
+
+def _describe(diff) -> str:
+    # compare_metadata yields (operation, objects...) tuples, or lists of
+    # them for column changes: (operation, schema, table, column, options, old, new)
+    if isinstance(diff, list):
+        return "; ".join(_describe(change) for change in diff)
+    operation, *objects = diff
+    if operation.startswith("modify_"):
+        _, table, column, _, old, new = objects
+        return f"{operation} {table}.{column}: database {old}, models {new}"
+    return f"{operation} {' '.join(_name(obj) for obj in objects if obj is not None)}"
+
+
+def _missing_indexes(connection: Connection, include_object) -> List[str]:
+    """Model indexes absent from the database, by name, whatever their definition."""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if include_object(index, index.name, "index", False, None) and index.name not in existing:
+                missing.append(f"missing index {index.name} on {table.name}")
+    return missing
+
+
+def find_differences(connection: Connection) -> List[str]:
+    include_object = include_object_for(connection.dialect.name)
+    context = MigrationContext.configure(
+        connection, opts={"include_object": include_object, "compare_type": compare_type}
+    )
+    differences = []
+
+    current = set(context.get_current_heads())
+    heads = set(ScriptDirectory.from_config(alembic_config()).get_heads())
+    if current != heads:
+        differences.append(
+            f"database is at revision {', '.join(sorted(current)) or 'none'}, latest is {', '.join(sorted(heads))}"
+        )
+
+    differences += [_describe(diff) for diff in compare_metadata(context, Base.metadata)]
+    differences += [
+        difference for difference in _missing_indexes(connection, include_object) if difference not in differences
+    ]
+
+    if connection.dialect.name == "postgresql":
+        invalid = connection.execute(
+            text("SELECT indexrelid::regclass::text FROM pg_index WHERE NOT indisvalid")
+        ).scalars()
+        differences += [f"invalid index {name} (interrupted concurrent build, rerun the migration)" for name in invalid]
+    return differences
+
+
+async def check_schema() -> List[str]:
+    async with engine.connect() as connection:
+        differences = await connection.run_sync(find_differences)
+    await engine.dispose()
+    return differences
+
+
+if __name__ == "__main__":
+    differences = asyncio.run(check_schema())
+    for difference in differences:
+        print(difference)
+    print("Schema matches the models." if not differences else f"{len(differences)} difference(s).")
+    sys.exit(1 if differences else 0)
@@ -1,11 +1,16 @@
-from app.db.base import Base
-from app.db.session import engine
-from app.db.models import user, ticket, message  # Make sure all models are imported
+import asyncio
+from alembic import command
+from app.db.migrations import alembic_config
 
-def create_tables():
-    print("Creating tables...")
-    Base.metadata.create_all(bind=engine)
+async def create_tables():
+    """
+    Create or update the schema by applying all pending migrations (the
+    same as `alembic upgrade head`).
+    """
+    print("Applying migrations...")
+    # Alembic drives its own event loop, so it runs in a worker thread
+    await asyncio.get_running_loop().run_in_executor(None, command.upgrade, alembic_config(), "head")
     print("Done.")
 
 if __name__ == "__main__":
-    create_tables()
+    asyncio.run(create_tables())
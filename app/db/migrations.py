@@ -0,0 +1,237 @@
+"""
+Helpers for the Alembic migrations in migrations/versions, for changes that
+must not lock hot tables, plus the Alembic configuration shared by
+init_db and check_schema.
+
+Every operation here also works on a database whose tables were created
+with `Base.metadata.create_all` (before migrations existed): objects that
+are already there are left alone.
+"""
+import os
+import time
+from typing import Optional, Sequence, Union
+
+from alembic import op
+from alembic.config import Config
+from sqlalchemy import Column, Uuid, inspect, pool, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.sql.elements import TextClause
+
+from app.db.models.message import MESSAGE_PARTITION_PATTERN
+from app.db.session import DATABASE_URL
+from app.utils.config import settings
+
+# alembic.ini at the repository root
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    # Leave the logging of the calling process as it is
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def migration_engine() -> AsyncEngine:
+    """
+    Engine for schema changes: connections of its own rather than the app's
+    pool, without the app's statement_timeout (index builds and backfills
+    run long) but with a lock_timeout, so DDL waiting for a lock on a busy
+    table gives up instead of queueing every query behind it.
+    """
+    connect_args = {}
+    if DATABASE_URL.startswith("postgresql") and settings.DB_MIGRATION_LOCK_TIMEOUT_MS:
+        connect_args["server_settings"] = {"lock_timeout": str(settings.DB_MIGRATION_LOCK_TIMEOUT_MS)}
+    return create_async_engine(DATABASE_URL, poolclass=pool.NullPool, connect_args=connect_args)
+
+
+def include_object_for(dialect_name: str):
+    """
+    Autogenerate / check_schema filter skipping the objects the models only
+    create on other dialects (`.ddl_if(dialect=...)`), and the partitions of
+    messages with their indexes, which app.db.partitions manages.
+    """
+
+    def include_object(object, name, type_, reflected, compare_to) -> bool:
+        table = name if type_ == "table" else getattr(getattr(object, "table", None), "name", None)
+        if reflected and table and MESSAGE_PARTITION_PATTERN.match(table):
+            return False
+        ddl_if = getattr(object, "_ddl_if", None)
+        return ddl_if is None or ddl_if.dialect is None or ddl_if.dialect == dialect_name
+
+    return include_object
+
+
+def compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type) -> Optional[bool]:
+    """
+    Autogenerate / check_schema type comparison: SQLite has no UUID type and
+    reflects UUID columns by their NUMERIC affinity. None compares as usual.
+    """
+    if context.dialect.name == "sqlite" and isinstance(metadata_type, Uuid):
+        return False
+    return None
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def add_column(table: str, column: Column) -> None:
+    """
+    op.add_column, skipped when the column exists. Add columns nullable and
+    without a volatile default, so PostgreSQL does not rewrite the table;
+    fill them with backfill() and add constraints afterwards.
+
+    A foreign key of the column is added NOT VALID on PostgreSQL and
+    validated after the migration's transaction commits, so the scan of
+    existing rows runs without blocking writes to `table`.
+    """
+    context = op.get_context()
+    if not context.as_sql and column.name in {c["name"] for c in inspect(op.get_bind()).get_columns(table)}:
+        return
+    if not column.foreign_keys:
+        op.add_column(table, column)
+    elif context.dialect.name == "sqlite":
+        # Alembic adds constraints to SQLite tables only by copying the table
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(column)
+    else:
+        (foreign_key,) = column.foreign_keys
+        referent, remote_column = foreign_key.target_fullname.rsplit(".", 1)
+        op.add_column(table, Column(column.name, column.type, nullable=column.nullable))
+        op.create_foreign_key(
+            foreign_key.name, table, referent, [column.name], [remote_column], postgresql_not_valid=True
+        )
+        with context.autocommit_block():
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {foreign_key.name}")
+
+
+def set_not_null(table: str, column: str) -> None:
+    """
+    Make `column` NOT NULL once backfill() has filled it. On PostgreSQL the
+    rows are checked by validating a NOT VALID check constraint, which does
+    not block writes, and SET NOT NULL then relies on it instead of scanning
+    the table under an exclusive lock.
+    """
+    context = op.get_context()
+    if not context.as_sql and not next(
+        c["nullable"] for c in inspect(op.get_bind()).get_columns(table) if c["name"] == column
+    ):
+        return
+    if not _is_postgresql():
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(column, nullable=False)
+        return
+
+    check = f"{table}_{column}_not_null"
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID")
+    with context.autocommit_block():
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+    op.alter_column(table, column, nullable=False)
+    op.drop_constraint(check, table, type_="check")
+
+
+def drop_foreign_key(table: str, column: str) -> None:
+    """
+    Drop the foreign key of `column`, whatever it was named (create_all
+    leaves them unnamed on SQLite).
+    """
+    context = op.get_context()
+    if context.as_sql:
+        names = [f"{table}_{column}_fkey"]
+    else:
+        names = [
+            fk["name"] for fk in inspect(op.get_bind()).get_foreign_keys(table) if fk["constrained_columns"] == [column]
+        ]
+    if not names:
+        return
+    if _is_postgresql():
+        for name in names:
+            op.drop_constraint(name, table, type_="foreignkey")
+        return
+    # Batch mode names the reflected constraints by this convention so they can be dropped
+    convention = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+    with op.batch_alter_table(table, naming_convention=convention) as batch:
+        batch.drop_constraint(f"{table}_{column}_fkey", type_="foreignkey")
+
+
+def create_index_online(name: str, table: str, columns: Sequence[Union[str, TextClause]], **kw) -> None:
+    """
+    Create an index without blocking writes to `table`: on PostgreSQL with
+    CREATE INDEX CONCURRENTLY, which cannot run inside a transaction and
+    so commits the migration's work done so far. An INVALID index left by
+    an interrupted concurrent build is dropped and built again.
+    """
+    if not _is_postgresql():
+        op.create_index(name, table, columns, if_not_exists=True, **kw)
+        return
+
+    context = op.get_context()
+    with context.autocommit_block():
+        if not context.as_sql and op.get_bind().scalar(
+            text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(CAST(:name AS text))"),
+            {"name": name},
+        ):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        # The build waits for transactions that were running when it started,
+        # however long that takes; the migration lock_timeout would abort it
+        op.execute("SET lock_timeout = 0")
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+        op.execute("RESET lock_timeout")
+
+
+def drop_index_online(name: str, table: str) -> None:
+    """Drop an index without blocking `table`, see create_index_online."""
+    if not _is_postgresql():
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill(
+    table: str,
+    assignments: str,
+    condition: str = "1 = 1",
+    batch_size: int = 5000,
+    pause: float = 0.1,
+    key: str = "id",
+) -> int:
+    """
+    Run `UPDATE table SET assignments WHERE condition` over ranges of
+    `batch_size` rows in primary key order, each range committed on its own,
+    so row locks are held briefly, autovacuum and replicas keep up, and an
+    interrupted backfill resumes where it stopped when `condition` excludes
+    rows already updated. Sleeps `pause` seconds between batches and returns
+    the number of rows updated. When no row matches `condition` the ranges
+    are not walked at all.
+    """
+    context = op.get_context()
+    if context.as_sql:
+        op.execute(f"UPDATE {table} SET {assignments} WHERE {condition}")
+        return 0
+
+    bind = op.get_bind()
+    # Often nothing is left to fill (a default covers new rows, or a rerun)
+    if not bind.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {table} WHERE {condition})")):
+        return 0
+    updated = 0
+    after: Optional[object] = None
+    with context.autocommit_block():
+        while True:
+            lower = "1 = 1" if after is None else f"{key} > :after"
+            # Last key of the next range, found by walking the primary key index
+            upper = bind.scalar(
+                text(f"SELECT {key} FROM {table} WHERE {lower} ORDER BY {key} LIMIT 1 OFFSET :offset"),
+                {"after": after, "offset": batch_size - 1},
+            )
+            bounds = lower if upper is None else f"{lower} AND {key} <= :upper"
+            result = bind.execute(
+                text(f"UPDATE {table} SET {assignments} WHERE {bounds} AND ({condition})"),
+                {"after": after, "upper": upper},
+            )
+            updated += max(result.rowcount, 0)
+            if upper is None:
+                return updated
+            after = upper
+            time.sleep(pause)
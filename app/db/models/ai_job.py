@@ -0,0 +1,30 @@
+import uuid
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from app.db.session import Base
+
+# Lifecycle of an AI reply job, mirrored on Ticket.ai_status
+AI_JOB_QUEUED = "queued"
+AI_JOB_RUNNING = "running"
+AI_JOB_COMPLETED = "completed"
+AI_JOB_FAILED = "failed"
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    __table_args__ = (
+        # Workers poll for the oldest queued job
+        Index("ix_ai_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    status = Column(String, default=AI_JOB_QUEUED, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
+    # No foreign key: messages may be partitioned (keyed by id and created_at)
+    # or moved to message_archives
+    message_id = Column(UUID(as_uuid=True), nullable=False)
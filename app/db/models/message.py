@@ -1,17 +1,31 @@
+import re
 import uuid
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
 
+# Full-text search document of a message on PostgreSQL, see TICKET_SEARCH_DOCUMENT
+MESSAGE_SEARCH_DOCUMENT = "to_tsvector('english', coalesce(content, ''))"
+
+# Partitions of messages when it is partitioned by month (see app.db.partitions)
+MESSAGE_PARTITION_PATTERN = re.compile(r"^messages_(p\d{6}|legacy|default)$")
+
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # History reads and "latest message" lookups per ticket, keyset ordered
+        Index("ix_messages_ticket_id_created_at_id", "ticket_id", "created_at", "id"),
+        # Full-text search (see app.services.search)
+        Index("ix_messages_search", text(MESSAGE_SEARCH_DOCUMENT), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     content = Column(String)
     is_ai = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Never NULL: the partition key when messages is partitioned by month (app.db.partitions)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"))
     ticket = relationship("Ticket", back_populates="messages")
@@ -0,0 +1,31 @@
+import uuid
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from app.db.session import Base
+
+# Encodings of MessageArchive.data (see app.services.archiver)
+ARCHIVE_PARQUET = "parquet"
+ARCHIVE_JSON_GZIP = "json.gz"
+
+class MessageArchive(Base):
+    """
+    A batch of a ticket's messages moved out of the messages table by the
+    archiver, stored compressed in `data` and read back by the history API.
+    """
+    __tablename__ = "message_archives"
+    __table_args__ = (
+        # Archives of a ticket overlapping a history page
+        Index("ix_message_archives_ticket_id_last_created_at", "ticket_id", "last_created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    format = Column(String, nullable=False)
+    message_count = Column(Integer, nullable=False)
+    # created_at of the oldest and newest archived message
+    first_created_at = Column(DateTime, nullable=False)
+    last_created_at = Column(DateTime, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
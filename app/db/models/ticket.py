@@ -1,19 +1,51 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
 
+# Lifecycle of a ticket: open until an agent claims it from the work queue,
+# in progress while leased to that agent, resolved once handled
+TICKET_OPEN = "open"
+TICKET_IN_PROGRESS = "in_progress"
+TICKET_RESOLVED = "resolved"
+TICKET_STATUSES = (TICKET_OPEN, TICKET_IN_PROGRESS, TICKET_RESOLVED)
+
+# Full-text search document of a ticket on PostgreSQL, title ranked above
+# description. Queries must use this exact expression to hit the GIN index.
+TICKET_SEARCH_DOCUMENT = (
+    "(setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B'))"
+)
+
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Keyset pagination of a user's tickets, newest first
+        Index("ix_tickets_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Filtering a user's tickets by status
+        Index("ix_tickets_user_id_status", "user_id", "status"),
+        # Agent work queue: oldest open (or expired in-progress) tickets first
+        Index("ix_tickets_status_created_at", "status", "created_at"),
+        # Full-text search (see app.services.search)
+        Index("ix_tickets_search", text(TICKET_SEARCH_DOCUMENT), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String)
     description = Column(String)
-    status = Column(String, default="open")
+    status = Column(String, default=TICKET_OPEN)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Status of the latest background AI reply job, None when none was requested
+    ai_status = Column(String, nullable=True)
+
+    # Agent working on the ticket, since when, and until when the claim holds
+    # unless renewed; expired claims return the ticket to the work queue
+    assigned_to = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    assigned_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
-    user = relationship("User", back_populates="tickets")
+    user = relationship("User", back_populates="tickets", foreign_keys=[user_id])
     messages = relationship("Message", back_populates="ticket")
@@ -0,0 +1,228 @@
+"""
+Monthly range partitioning of the messages table on created_at (PostgreSQL).
+
+    python -m app.db.partitions convert   # partition the existing table, once
+    python -m app.db.partitions ensure    # create the coming months' partitions
+
+`convert` copies no rows: the existing table becomes messages_legacy, the
+partition of everything before next month. The unique index and range
+check that attaching it requires are built first without blocking writes,
+so the swap itself is a short catalog-only transaction. Every following
+month gets its own partition (messages_pYYYYMM), created ahead of time by
+`ensure`, which app.services.archiver also runs periodically; rows dated
+outside every partition land in messages_default. Partitions left empty
+by archival are dropped, which returns their space at once.
+"""
+import argparse
+import asyncio
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+
+from app.db.migrations import migration_engine
+from app.db.models.message import Message
+from app.utils.config import settings
+
+LEGACY_PARTITION = "messages_legacy"
+DEFAULT_PARTITION = "messages_default"
+
+_LEGACY_KEY = "messages_legacy_id_created_at"
+_LEGACY_BOUND = "messages_legacy_bound"
+_RANGE_PATTERN = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+# [from, to) of a range partition; None for MINVALUE / MAXVALUE
+Bounds = Tuple[Optional[datetime], Optional[datetime]]
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"messages_p{month:%Y%m}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.scalar(text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('messages')")))
+
+
+def _bound(value: str) -> Optional[datetime]:
+    return None if value in ("MINVALUE", "MAXVALUE") else datetime.fromisoformat(value.strip("'"))
+
+
+def range_partitions(connection: Connection) -> Dict[str, Bounds]:
+    """The range partitions of messages (all but the default one) and their bounds."""
+    rows = connection.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'messages'::regclass"
+    ))
+    partitions = {}
+    for name, bound in rows:
+        match = _RANGE_PATTERN.search(bound)
+        if match:
+            partitions[name] = (_bound(match.group(1)), _bound(match.group(2)))
+    return partitions
+
+
+def _overlaps(lower: datetime, upper: datetime, bounds: Bounds) -> bool:
+    return (bounds[0] is None or bounds[0] < upper) and (bounds[1] is None or lower < bounds[1])
+
+
+def ensure_partitions(connection: Connection, months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the partitions of the current month and the `months_ahead`
+    following ones that no existing partition covers. Returns their names.
+    """
+    existing = list(range_partitions(connection).values())
+    month = month_start(now or datetime.utcnow())
+    created = []
+    for _ in range(months_ahead + 1):
+        following = add_months(month, 1)
+        if not any(_overlaps(month, following, bounds) for bounds in existing):
+            name = partition_name(month)
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF messages FOR VALUES FROM ('{month}') TO ('{following}')"
+            ))
+            created.append(name)
+        month = following
+    return created
+
+
+def drop_empty_partitions(connection: Connection, before: datetime) -> List[str]:
+    """
+    Drop the monthly partitions that end before `before` and hold no rows,
+    e.g. once every message of their months was archived. Returns their names.
+    """
+    dropped = []
+    for name, (lower, upper) in range_partitions(connection).items():
+        # messages_legacy, open below, holds everything from before partitioning
+        if lower is None or upper is None or upper > before:
+            continue
+        # Checked without a lock first: the lock is held until commit and
+        # queues every query on messages behind it
+        if connection.scalar(text(f"SELECT 1 FROM {name} LIMIT 1")) is not None:
+            continue
+        # Checked again under the lock, so no row can be added before the drop
+        connection.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+        if connection.scalar(text(f"SELECT 1 FROM {name} LIMIT 1")) is None:
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def _prepare_legacy(connection: Connection, boundary: datetime) -> None:
+    """
+    Build what attaching the current table as a partition needs, without
+    blocking writes to it. Runs in autocommit mode; safe to run again.
+    """
+    if connection.scalar(
+        text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": _LEGACY_KEY}
+    ):
+        connection.execute(text(f"DROP INDEX CONCURRENTLY {_LEGACY_KEY}"))
+    # Partitioned tables are unique on the partition key only; the build
+    # waits for running transactions, however long that takes
+    connection.execute(text("SET lock_timeout = 0"))
+    connection.execute(text(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {_LEGACY_KEY} ON messages (id, created_at)"))
+    connection.execute(text("RESET lock_timeout"))
+    # Proves that every row falls before the boundary, so ATTACH PARTITION
+    # does not scan the table under its lock
+    connection.execute(text(f"ALTER TABLE messages DROP CONSTRAINT IF EXISTS {_LEGACY_BOUND}"))
+    connection.execute(text(
+        f"ALTER TABLE messages ADD CONSTRAINT {_LEGACY_BOUND} CHECK (created_at < '{boundary}') NOT VALID"
+    ))
+    connection.execute(text(f"ALTER TABLE messages VALIDATE CONSTRAINT {_LEGACY_BOUND}"))
+
+
+def _swap(connection: Connection, boundary: datetime, months_ahead: int) -> None:
+    """Replace messages by a partitioned table with the old one as its first partition."""
+    connection.execute(text(f"ALTER TABLE messages RENAME TO {LEGACY_PARTITION}"))
+    # Free the names of the constraints and indexes for the new table
+    constraints = connection.scalars(text(
+        f"SELECT conname FROM pg_constraint WHERE conrelid = '{LEGACY_PARTITION}'::regclass"
+    )).all()
+    for name in constraints:
+        if not name.startswith("messages_") or name.startswith(LEGACY_PARTITION):
+            continue
+        connection.execute(text(
+            f"ALTER TABLE {LEGACY_PARTITION} RENAME CONSTRAINT {name} TO {name.replace('messages', LEGACY_PARTITION, 1)}"
+        ))
+    indexes = connection.scalars(text(
+        f"SELECT indexname FROM pg_indexes WHERE tablename = '{LEGACY_PARTITION}' AND indexname LIKE 'ix_messages%'"
+    )).all()
+    for name in indexes:
+        connection.execute(text(f"ALTER INDEX {name} RENAME TO {name.replace('messages', LEGACY_PARTITION, 1)}"))
+    # The primary key moves to (id, created_at), as on the partitioned table
+    connection.execute(text(f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {LEGACY_PARTITION}_pkey"))
+    connection.execute(text(
+        f"ALTER TABLE {LEGACY_PARTITION} ADD CONSTRAINT {LEGACY_PARTITION}_pkey PRIMARY KEY USING INDEX {_LEGACY_KEY}"
+    ))
+
+    connection.execute(text(
+        f"CREATE TABLE messages (LIKE {LEGACY_PARTITION} INCLUDING DEFAULTS, PRIMARY KEY (id, created_at), "
+        "FOREIGN KEY (ticket_id) REFERENCES tickets (id)) PARTITION BY RANGE (created_at)"
+    ))
+    # Instant on the empty parent; attaching finds the equivalent indexes
+    # of the old table instead of building new ones
+    for index in Message.__table__.indexes:
+        connection.execute(CreateIndex(index))
+    connection.execute(text(
+        f"ALTER TABLE messages ATTACH PARTITION {LEGACY_PARTITION} FOR VALUES FROM (MINVALUE) TO ('{boundary}')"
+    ))
+    connection.execute(text(f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {_LEGACY_BOUND}"))
+    ensure_partitions(connection, months_ahead)
+    connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF messages DEFAULT"))
+
+
+def convert_to_partitioned(connection: Connection, months_ahead: int) -> List[str]:
+    """Partition messages by month, see the module docstring. Returns the partitions."""
+    if connection.dialect.name != "postgresql":
+        raise RuntimeError("Partitioning messages requires PostgreSQL")
+    if not is_partitioned(connection):
+        boundary = add_months(month_start(datetime.utcnow()), 1)
+        connection.commit()
+        connection.execution_options(isolation_level="AUTOCOMMIT")
+        _prepare_legacy(connection, boundary)
+        connection.commit()
+        connection.execution_options(isolation_level="READ COMMITTED")
+        with connection.begin():
+            _swap(connection, boundary, months_ahead)
+        connection.execute(text("ANALYZE messages"))
+    else:
+        ensure_partitions(connection, months_ahead)
+    connection.commit()
+    return sorted(range_partitions(connection))
+
+
+async def _run(command: str, months_ahead: int) -> List[str]:
+    engine = migration_engine()
+    try:
+        async with engine.connect() as connection:
+            if command == "convert":
+                return await connection.run_sync(convert_to_partitioned, months_ahead)
+            if not await connection.run_sync(is_partitioned):
+                raise RuntimeError("messages is not partitioned; run python -m app.db.partitions convert")
+            created = await connection.run_sync(ensure_partitions, months_ahead)
+            await connection.commit()
+            return created
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["convert", "ensure"])
+    parser.add_argument("--months-ahead", type=int, default=settings.MESSAGE_PARTITIONS_AHEAD)
+    args = parser.parse_args()
+    names = asyncio.run(_run(args.command, args.months_ahead))
+    print(f"{'Partitions' if args.command == 'convert' else 'Created'}: {', '.join(names) or 'none'}")
@@ -1,20 +1,104 @@
-from sqlalchemy import create_engine
+import time
+from uuid import uuid4
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from app.utils.config import settings
+from app.utils import metrics
+
+# Async drivers used for the sync-style URLs accepted in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(url: str) -> str:
+    """
+    Rewrite DATABASE_URL to use an async driver, e.g. postgresql:// -> postgresql+asyncpg://
+    """
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait for a free connection.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+def get_engine_options(url: str) -> dict:
+    """
+    Engine keyword arguments for the configured pool, echo and timeout settings.
+    """
+    options = {"echo": settings.DB_ECHO}
+    connect_args = {}
+
+    if settings.DB_PGBOUNCER:
+        # PgBouncer owns the pooling; a client-side pool would pin server
+        # connections, and named prepared statements may land on another backend
+        options["poolclass"] = NullPool
+        # asyncpg arguments; other drivers reject them at connect
+        if url.startswith("postgresql"):
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+        # Sent as a startup parameter, which PgBouncer rejects by default; set
+        # it on the database role instead when connecting through PgBouncer
+        if settings.DB_STATEMENT_TIMEOUT_MS and url.startswith("postgresql"):
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+DATABASE_URL = get_async_database_url(settings.DATABASE_URL)
 
 # Create engine
-engine = create_engine(settings.DATABASE_URL, echo=True)
+engine = create_async_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    metrics.DB_QUERY_DURATION.observe(elapsed, operation=statement.lstrip().split(None, 1)[0].upper())
+    stats = metrics.request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _discard_query_timer(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
 
-# Create a session local factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create a session local factory; objects stay usable after commit since
+# lazy refreshes are not possible with async sessions
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # Define the base class for declarative models
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
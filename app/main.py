@@ -1,8 +1,62 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.routes import auth, tickets, messages
+from app.api.routes import auth, tickets, messages, metrics, imports, agent, events, health
+from app.db.session import engine
+from app.services.groq import llm_router
+from app.services.ai_jobs import ai_job_queue
+from app.services.archiver import message_archiver
+from app.services.events import event_broker
+from app.services.password_hasher import password_hasher
+from app.services.warmup import readiness, warm_up
+from app.utils.config import settings
+from app.utils.metrics import MetricsMiddleware
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await event_broker.start()
+    await ai_job_queue.start()
+    await message_archiver.start()
+    # Warm up in the background: the worker answers /healthz right away and
+    # /readyz once connections are open and caches are loaded
+    warmup = asyncio.create_task(warm_up())
+    yield
+    readiness.draining = True
+    warmup.cancel()
+    await asyncio.gather(warmup, return_exceptions=True)
+    await message_archiver.stop()
+    await ai_job_queue.stop()
+    await event_broker.stop()
+    # Release pooled upstream and database connections on shutdown
+    await llm_router.aclose()
+    await engine.dispose()
+    password_hasher.shutdown()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
+
+app.include_router(health.router)
 app.include_router(auth.router)
 app.include_router(tickets.router)
 app.include_router(messages.router)
+app.include_router(imports.router)
+app.include_router(agent.router)
+app.include_router(events.router)
+
+# Workers only become ready after importing the app, so its import time
+# counts against how fast new workers can take traffic
+readiness.timings["import"] = time.perf_counter() - _import_started
+if readiness.timings["import"] > settings.IMPORT_TIME_BUDGET_SECONDS:
+    logger.warning(
+        f"Importing the app took {readiness.timings['import']:.3f}s, over the "
+        f"{settings.IMPORT_TIME_BUDGET_SECONDS}s budget (see python -m benchmarks.import_time)"
+    )
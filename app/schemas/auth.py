@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr
+from uuid import UUID
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -11,3 +12,12 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+
+class CurrentUser(BaseModel):
+    """Authenticated user principal, safe to cache outside a DB session."""
+    id: UUID
+    email: str
+    role: str
+
+    class Config:
+        from_attributes = True
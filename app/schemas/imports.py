@@ -0,0 +1,56 @@
+import re
+from datetime import datetime, timezone
+from typing import Literal, Optional, Union
+from uuid import UUID
+
+from pydantic import AfterValidator, BaseModel, Field, TypeAdapter
+from typing_extensions import Annotated
+
+from app.db.models.ticket import TICKET_OPEN, TICKET_STATUSES
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Timestamps are stored as naive UTC
+UTCDatetime = Annotated[datetime, AfterValidator(_naive_utc)]
+
+
+def _ticket_status(value: str) -> str:
+    # Accepts other spellings of the same status, e.g. "In Progress"
+    status = re.sub(r"[\s-]+", "_", value.strip().lower())
+    if status not in TICKET_STATUSES:
+        raise ValueError(f"unknown status, expected one of {', '.join(TICKET_STATUSES)}")
+    return status
+
+
+# Statuses the API, the work queue and the archiver know
+TicketStatus = Annotated[str, AfterValidator(_ticket_status)]
+
+
+class TicketImport(BaseModel):
+    type: Literal["ticket"]
+    # Given ids let the messages that follow refer to the ticket
+    id: Optional[UUID] = None
+    title: str
+    description: str = ""
+    status: TicketStatus = TICKET_OPEN
+    created_at: Optional[UTCDatetime] = None
+    # Owner of the ticket; defaults to the importing user
+    user_id: Optional[UUID] = None
+
+
+class MessageImport(BaseModel):
+    type: Literal["message"]
+    id: Optional[UUID] = None
+    ticket_id: UUID
+    content: str
+    is_ai: bool = False
+    created_at: Optional[UTCDatetime] = None
+
+
+# One line of an NDJSON import, told apart by its "type"
+IMPORT_ROW_ADAPTER = TypeAdapter(Annotated[Union[TicketImport, MessageImport], Field(discriminator="type")])
@@ -1,5 +1,14 @@
+from enum import Enum
 from pydantic import BaseModel
 from uuid import UUID
 
 class MessageCreate(BaseModel):
     content: str
+
+class AIMode(str, Enum):
+    # Generate the AI reply inside the request and return it in the response
+    sync = "sync"
+    # Only store the user message; the reply is generated live by GET /ai-response
+    stream = "stream"
+    # Store the user message, answer 202 and generate the reply in a background job
+    background = "background"
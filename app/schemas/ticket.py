@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
@@ -20,7 +20,21 @@ class TicketOut(BaseModel):
     status: str
     created_at: datetime
     user_id: UUID
+    ai_status: Optional[str] = None
 
     class Config:
         orm_mode = True
         from_attributes = True
+
+class AssignedTicketOut(TicketOut):
+    """A ticket as seen by agents working the queue."""
+    assigned_to: Optional[UUID] = None
+    assigned_at: Optional[datetime] = None
+    lease_expires_at: Optional[datetime] = None
+
+# Adapters for serializing ORM rows with app.utils.responses.dump_models / dump_page
+TICKET_ADAPTER = TypeAdapter(TicketOut)
+TICKET_LIST_ADAPTER = TypeAdapter(List[TicketOut])
+MESSAGE_LIST_ADAPTER = TypeAdapter(List[MessageOut])
+ASSIGNED_TICKET_ADAPTER = TypeAdapter(AssignedTicketOut)
+ASSIGNED_TICKET_LIST_ADAPTER = TypeAdapter(List[AssignedTicketOut])
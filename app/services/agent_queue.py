@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.ticket import Ticket, TICKET_OPEN, TICKET_IN_PROGRESS, TICKET_RESOLVED
+from app.services.events import event_broker, TICKET_UPDATED
+from app.services.ticket_cache import ticket_cache
+from app.utils.config import settings
+
+
+class AgentQueue:
+    """
+    Hands out tickets to agents, oldest first. Claims lock candidate rows
+    with SELECT ... FOR UPDATE SKIP LOCKED inside a single UPDATE, so
+    concurrent agents never wait on each other or receive the same ticket.
+
+    A claim is a lease: an agent renews it while working on the ticket, and
+    a ticket whose lease expired is handed out again.
+    """
+
+    def __init__(self, lease_seconds: int):
+        self.lease_seconds = lease_seconds
+
+    async def _assign(self, db: AsyncSession, condition, agent_id: UUID, limit: int, now: datetime) -> List[Ticket]:
+        candidates = (
+            select(Ticket.id)
+            .filter(condition)
+            .order_by(Ticket.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(Ticket)
+            .filter(Ticket.id.in_(candidates))
+            .values(
+                status=TICKET_IN_PROGRESS,
+                assigned_to=agent_id,
+                assigned_at=now,
+                lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+            )
+            .returning(Ticket)
+            .execution_options(synchronize_session=False)
+        )
+        return list(await db.scalars(statement))
+
+    async def claim(self, db: AsyncSession, agent_id: UUID, limit: int) -> List[Ticket]:
+        """
+        Lease up to `limit` tickets to `agent_id`: abandoned ones whose lease
+        expired first, then the oldest open ones.
+        """
+        now = datetime.utcnow()
+        tickets = await self._assign(
+            db, and_(Ticket.status == TICKET_IN_PROGRESS, Ticket.lease_expires_at < now), agent_id, limit, now
+        )
+        if len(tickets) < limit:
+            tickets += await self._assign(db, Ticket.status == TICKET_OPEN, agent_id, limit - len(tickets), now)
+        await db.commit()
+
+        for ticket in tickets:
+            await ticket_cache.invalidate(ticket.id)
+            await event_broker.publish(TICKET_UPDATED, ticket.user_id, ticket.id, {"status": ticket.status})
+        return sorted(tickets, key=lambda ticket: ticket.created_at)
+
+    async def _update_leased(self, db: AsyncSession, ticket_id: UUID, agent_id: UUID, **values) -> Optional[Ticket]:
+        # Only the agent currently holding the lease may change it
+        ticket = await db.scalar(
+            update(Ticket)
+            .filter(
+                Ticket.id == ticket_id,
+                Ticket.assigned_to == agent_id,
+                Ticket.status == TICKET_IN_PROGRESS,
+            )
+            .values(**values)
+            .returning(Ticket)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if ticket is not None:
+            await ticket_cache.invalidate(ticket_id)
+            if "status" in values:
+                await event_broker.publish(TICKET_UPDATED, ticket.user_id, ticket_id, {"status": ticket.status})
+        return ticket
+
+    async def renew(self, db: AsyncSession, ticket_id: UUID, agent_id: UUID) -> Optional[Ticket]:
+        """Extend the lease; None when the ticket is not leased to `agent_id`."""
+        expires = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        return await self._update_leased(db, ticket_id, agent_id, lease_expires_at=expires)
+
+    async def release(self, db: AsyncSession, ticket_id: UUID, agent_id: UUID) -> Optional[Ticket]:
+        """Put the ticket back in the queue."""
+        return await self._update_leased(
+            db, ticket_id, agent_id, status=TICKET_OPEN, assigned_to=None, assigned_at=None, lease_expires_at=None
+        )
+
+    async def resolve(self, db: AsyncSession, ticket_id: UUID, agent_id: UUID) -> Optional[Ticket]:
+        """Mark the ticket handled; it keeps its assignment for the record."""
+        return await self._update_leased(db, ticket_id, agent_id, status=TICKET_RESOLVED, lease_expires_at=None)
+
+
+agent_queue = AgentQueue(lease_seconds=settings.AGENT_LEASE_SECONDS)
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import SessionLocal
+from app.db.models.ai_job import AIJob, AI_JOB_QUEUED, AI_JOB_RUNNING, AI_JOB_COMPLETED, AI_JOB_FAILED
+from app.db.models.message import Message
+from app.db.models.ticket import Ticket
+from app.services.events import event_broker, message_data, MESSAGE_CREATED, TICKET_UPDATED
+from app.services.groq import get_groq_response
+from app.services.prompt_builder import prompt_builder
+from app.services.ticket_cache import ticket_cache
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AIJobQueueFull(Exception):
+    """Raised when a job cannot be accepted because the queue is at capacity."""
+
+
+@dataclass
+class AIJobRequest:
+    ticket_id: UUID
+    message_id: UUID
+
+
+async def _set_ticket_ai_status(ticket_id: UUID, ai_status: str) -> None:
+    async with SessionLocal() as db:
+        user_id = await db.scalar(
+            update(Ticket).filter(Ticket.id == ticket_id).values(ai_status=ai_status).returning(Ticket.user_id)
+        )
+        await db.commit()
+    await ticket_cache.invalidate(ticket_id)
+    if user_id is not None:
+        await event_broker.publish(TICKET_UPDATED, user_id, ticket_id, {"ai_status": ai_status})
+
+async def _is_answered(db: AsyncSession, job: AIJobRequest) -> bool:
+    """Whether an AI reply was saved after the job's user message, or that message is gone."""
+    asked_at = await db.scalar(select(Message.created_at).filter(
+        Message.ticket_id == job.ticket_id, Message.id == job.message_id
+    ))
+    if asked_at is None:
+        return True
+    return bool(await db.scalar(select(exists().where(
+        Message.ticket_id == job.ticket_id, Message.is_ai.is_(True), Message.created_at > asked_at
+    ))))
+
+async def _save_ai_reply(job: AIJobRequest, content: str) -> None:
+    """
+    Store the reply unless the message was answered meanwhile, e.g. by a
+    worker that took over the job or a duplicate job.
+    """
+    async with SessionLocal() as db:
+        # Updated first, so the check below runs under the ticket's row lock
+        user_id = await db.scalar(
+            update(Ticket).filter(Ticket.id == job.ticket_id).values(ai_status=AI_JOB_COMPLETED).returning(Ticket.user_id)
+        )
+        ai_msg = None
+        if not await _is_answered(db, job):
+            ai_msg = Message(content=content, ticket_id=job.ticket_id, is_ai=True)
+            db.add(ai_msg)
+        await db.commit()
+    await ticket_cache.invalidate(job.ticket_id)
+    if user_id is not None:
+        if ai_msg is not None:
+            await event_broker.publish(MESSAGE_CREATED, user_id, job.ticket_id, message_data(ai_msg))
+        await event_broker.publish(TICKET_UPDATED, user_id, job.ticket_id, {"ai_status": AI_JOB_COMPLETED})
+
+async def process_ai_job(job: AIJobRequest, last_attempt: bool = True) -> None:
+    """
+    Generate and store the AI reply for a user message, keeping the ticket's
+    `ai_status` in step with the job. Messages that already have a reply are
+    not answered again. When a failed job will be retried (`last_attempt`
+    false) the ticket goes back to queued rather than failed.
+    """
+    await _set_ticket_ai_status(job.ticket_id, AI_JOB_RUNNING)
+    try:
+        async with SessionLocal() as db:
+            answered = await _is_answered(db, job)
+            if not answered:
+                ticket = await db.get(Ticket, job.ticket_id)
+                conversation = await prompt_builder.build(db, ticket)
+        if answered:
+            await _set_ticket_ai_status(job.ticket_id, AI_JOB_COMPLETED)
+            return
+        reply = await get_groq_response(conversation)
+        await _save_ai_reply(job, reply)
+    except Exception:
+        await _set_ticket_ai_status(job.ticket_id, AI_JOB_FAILED if last_attempt else AI_JOB_QUEUED)
+        raise
+
+
+class AIJobQueue(ABC):
+    """
+    Runs AI reply generation outside of the request that created the message.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @abstractmethod
+    async def enqueue(self, job: AIJobRequest) -> None:
+        """Accept a job or raise AIJobQueueFull."""
+
+    @abstractmethod
+    async def _worker(self, worker_id: int) -> None:
+        """Process jobs until cancelled."""
+
+
+class InProcessAIJobQueue(AIJobQueue):
+    """
+    Bounded asyncio queue drained by worker tasks in this process. Jobs that
+    are still waiting when the process stops are lost.
+    """
+
+    def __init__(self, workers: int, maxsize: int):
+        super().__init__(workers)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def enqueue(self, job: AIJobRequest) -> None:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise AIJobQueueFull()
+
+    async def stop(self) -> None:
+        await super().stop()
+        if not self._queue.empty():
+            logger.warning(f"Dropping {self._queue.qsize()} queued AI jobs on shutdown")
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await process_ai_job(job)
+            except Exception as e:
+                logger.error(f"AI job for ticket {job.ticket_id} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+class DatabaseAIJobQueue(AIJobQueue):
+    """
+    Durable queue backed by the ai_jobs table. Workers in any process claim the
+    oldest queued job with SELECT ... FOR UPDATE SKIP LOCKED, so they never
+    block on each other. A running job's lease is renewed while it runs, so
+    only jobs whose worker died are reclaimed once the lease expires. Failed
+    jobs are queued again until they have been attempted `max_attempts` times.
+    """
+
+    def __init__(self, workers: int, poll_interval: float, lease_seconds: int, max_attempts: int):
+        super().__init__(workers)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(max_attempts, 1)
+
+    async def _claim(self) -> Optional[Tuple[UUID, AIJobRequest, int]]:
+        async with SessionLocal() as db:
+            lease_expired = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+            job = await db.scalar(select(AIJob).filter(
+                or_(
+                    AIJob.status == AI_JOB_QUEUED,
+                    and_(AIJob.status == AI_JOB_RUNNING, AIJob.updated_at < lease_expired)
+                )
+            ).order_by(AIJob.created_at).limit(1).with_for_update(skip_locked=True))
+            if not job:
+                return None
+
+            # Conditional on the attempts read, since databases without
+            # SKIP LOCKED (SQLite) let two workers select the same job
+            attempts = job.attempts + 1
+            claimed = await db.execute(update(AIJob).filter(
+                AIJob.id == job.id, AIJob.attempts == job.attempts
+            ).values(status=AI_JOB_RUNNING, attempts=attempts, updated_at=datetime.utcnow()))
+            await db.commit()
+            if claimed.rowcount != 1:
+                return None
+            return job.id, AIJobRequest(job.ticket_id, job.message_id), attempts
+
+    async def _finish(self, job_id: UUID, status: str, error: Optional[str] = None) -> None:
+        async with SessionLocal() as db:
+            await db.execute(update(AIJob).filter(AIJob.id == job_id).values(status=status, error=error))
+            await db.commit()
+
+    async def _renew_lease(self, job_id: UUID) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with SessionLocal() as db:
+                    await db.execute(update(AIJob).filter(
+                        AIJob.id == job_id, AIJob.status == AI_JOB_RUNNING
+                    ).values(updated_at=datetime.utcnow()))
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Renewing the lease of AI job {job_id} failed: {e}")
+
+    async def enqueue(self, job: AIJobRequest) -> None:
+        async with SessionLocal() as db:
+            db.add(AIJob(ticket_id=job.ticket_id, message_id=job.message_id))
+            await db.commit()
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            try:
+                claimed = await self._claim()
+            except Exception as e:
+                logger.error(f"Claiming AI job failed: {e}")
+                claimed = None
+
+            if not claimed:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            job_id, job, attempts = claimed
+            if attempts > self.max_attempts:
+                # Its worker died during the last attempt
+                await self._finish(job_id, AI_JOB_FAILED, "lease expired on the last attempt")
+                await _set_ticket_ai_status(job.ticket_id, AI_JOB_FAILED)
+                continue
+
+            last_attempt = attempts >= self.max_attempts
+            lease = asyncio.create_task(self._renew_lease(job_id))
+            try:
+                await process_ai_job(job, last_attempt)
+                await self._finish(job_id, AI_JOB_COMPLETED)
+            except Exception as e:
+                logger.error(f"AI job {job_id} failed (attempt {attempts} of {self.max_attempts}): {e}")
+                await self._finish(job_id, AI_JOB_FAILED if last_attempt else AI_JOB_QUEUED, str(e))
+            finally:
+                lease.cancel()
+
+
+def create_ai_job_queue() -> AIJobQueue:
+    if settings.AI_JOB_BACKEND == "memory":
+        return InProcessAIJobQueue(settings.AI_JOB_WORKERS, settings.AI_JOB_QUEUE_SIZE)
+    if settings.AI_JOB_BACKEND == "database":
+        return DatabaseAIJobQueue(
+            settings.AI_JOB_WORKERS,
+            settings.AI_JOB_POLL_INTERVAL,
+            settings.AI_JOB_LEASE_SECONDS,
+            settings.AI_JOB_MAX_ATTEMPTS,
+        )
+    raise ValueError(f"Unknown AI_JOB_BACKEND: {settings.AI_JOB_BACKEND}")
+
+
+ai_job_queue = create_ai_job_queue()
@@ -0,0 +1,274 @@
+"""
+Keeps the messages table small: moves the messages of resolved tickets
+older than MESSAGE_ARCHIVE_AFTER_DAYS into compressed MessageArchive rows,
+which the history API reads back, and maintains the monthly partitions of
+a partitioned messages table (see app.db.partitions).
+"""
+import asyncio
+import gzip
+import importlib.util
+import io
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, exists, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.message import Message
+from app.db.models.message_archive import MessageArchive, ARCHIVE_PARQUET, ARCHIVE_JSON_GZIP
+from app.db.models.ticket import Ticket, TICKET_RESOLVED
+from app.db.partitions import drop_empty_partitions, ensure_partitions, is_partitioned
+from app.db.session import engine, SessionLocal
+from app.schemas.ticket import MessageOut, MESSAGE_LIST_ADAPTER
+from app.services.search import ticket_search
+from app.utils.cache import TTLCache
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Lock held while maintaining partitions, so workers take turns
+PARTITION_MAINTENANCE_LOCK = 7219004
+
+# Messages deleted per statement once archived
+DELETE_CHUNK_SIZE = 1000
+
+MessageKey = Tuple[datetime, UUID]
+
+
+def _key(message) -> MessageKey:
+    return (message.created_at, message.id)
+
+
+def _pyarrow_installed() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _pyarrow():
+    # Imported on first use rather than with the app: it is optional, and
+    # slow enough to import to count against the startup budget
+    if not _pyarrow_installed():
+        raise RuntimeError("Parquet message archives require pyarrow (pip install pyarrow)")
+    return importlib.import_module("pyarrow"), importlib.import_module("pyarrow.parquet")
+
+
+def archive_format(name: str) -> str:
+    """The encoding selected by MESSAGE_ARCHIVE_FORMAT."""
+    if name == "auto":
+        return ARCHIVE_PARQUET if _pyarrow_installed() else ARCHIVE_JSON_GZIP
+    if name == ARCHIVE_PARQUET:
+        _pyarrow()
+    elif name != ARCHIVE_JSON_GZIP:
+        raise ValueError(f"Unknown message archive format: {name}")
+    return name
+
+
+def encode_messages(messages: List[MessageOut], format: str) -> bytes:
+    if format == ARCHIVE_JSON_GZIP:
+        return gzip.compress(MESSAGE_LIST_ADAPTER.dump_json(messages))
+    pa, pq = _pyarrow()
+    table = pa.table({
+        "id": pa.array([str(message.id) for message in messages], pa.string()),
+        "content": pa.array([message.content for message in messages], pa.string()),
+        "is_ai": pa.array([message.is_ai for message in messages], pa.bool_()),
+        "created_at": pa.array([message.created_at for message in messages], pa.timestamp("us")),
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def decode_messages(data: bytes, format: str) -> List[MessageOut]:
+    if format == ARCHIVE_JSON_GZIP:
+        return MESSAGE_LIST_ADAPTER.validate_json(gzip.decompress(data))
+    _, pq = _pyarrow()
+    return MESSAGE_LIST_ADAPTER.validate_python(pq.read_table(io.BytesIO(data)).to_pylist())
+
+
+class MessageArchiver:
+    """
+    Runs message maintenance every `interval` seconds in each worker:
+    partitions for the coming months, archival of old conversations, then
+    dropping the partitions archival emptied. Tickets being archived are
+    locked with SKIP LOCKED, so workers never archive the same one twice.
+
+    Archives never change once written, so decoded ones are cached by id.
+    """
+
+    def __init__(
+        self,
+        after_days: int,
+        interval: float,
+        batch_tickets: int,
+        format: str,
+        cache_size: int,
+        partitions_ahead: int,
+    ):
+        self.after_days = after_days
+        self.interval = interval
+        self.batch_tickets = batch_tickets
+        self.format = format
+        self.partitions_ahead = partitions_ahead
+        self._archives = TTLCache(cache_size, float("inf"))
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if engine.dialect.name == "postgresql" or self.after_days > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"Message maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=self.after_days)
+
+    async def maintain(self) -> None:
+        if engine.dialect.name == "postgresql":
+            created = await self._maintain_partitions(ensure_partitions, self.partitions_ahead)
+            if created:
+                logger.info(f"Created message partitions {', '.join(created)}")
+        if self.after_days <= 0:
+            return
+        tickets, messages = await self.archive()
+        if messages:
+            logger.info(f"Archived {messages} messages of {tickets} tickets")
+        if engine.dialect.name == "postgresql":
+            dropped = await self._maintain_partitions(drop_empty_partitions, self.cutoff())
+            if dropped:
+                logger.info(f"Dropped emptied message partitions {', '.join(dropped)}")
+
+    async def _maintain_partitions(self, step, *args) -> List[str]:
+        async with engine.begin() as connection:
+            if not await connection.run_sync(is_partitioned):
+                return []
+            if not await connection.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": PARTITION_MAINTENANCE_LOCK}
+            ):
+                return []
+            # Partition DDL locks the whole table; give up rather than queue queries behind it
+            await connection.execute(text(f"SET LOCAL lock_timeout = {settings.DB_MIGRATION_LOCK_TIMEOUT_MS}"))
+            return await connection.run_sync(step, *args)
+
+    async def archive(self) -> Tuple[int, int]:
+        """Archive up to batch_tickets tickets; returns how many, and how many messages."""
+        cutoff = self.cutoff()
+        async with SessionLocal() as db:
+            # Tickets created after the cutoff cannot have messages before it
+            ticket_ids = (await db.scalars(select(Ticket.id).filter(
+                Ticket.status == TICKET_RESOLVED,
+                Ticket.created_at < cutoff,
+                exists().where(Message.ticket_id == Ticket.id, Message.created_at < cutoff),
+            ).order_by(Ticket.created_at).limit(self.batch_tickets))).all()
+
+        tickets = messages = 0
+        for ticket_id in ticket_ids:
+            archived = await self.archive_ticket(ticket_id, cutoff)
+            if archived:
+                tickets += 1
+                messages += archived
+        return tickets, messages
+
+    async def archive_ticket(self, ticket_id: UUID, cutoff: datetime) -> int:
+        """Move a resolved ticket's messages created before `cutoff` into one archive."""
+        format = archive_format(self.format)
+        async with SessionLocal() as db:
+            locked = await db.scalar(select(Ticket.id).filter(
+                Ticket.id == ticket_id, Ticket.status == TICKET_RESOLVED
+            ).with_for_update(skip_locked=True))
+            if not locked:
+                return 0
+
+            rows = (await db.scalars(select(Message).filter(
+                Message.ticket_id == ticket_id, Message.created_at < cutoff
+            ).order_by(Message.created_at, Message.id))).all()
+            if not rows:
+                return 0
+            messages = MESSAGE_LIST_ADAPTER.validate_python(rows, from_attributes=True)
+            db.add(MessageArchive(
+                ticket_id=ticket_id,
+                format=format,
+                message_count=len(messages),
+                first_created_at=messages[0].created_at,
+                last_created_at=messages[-1].created_at,
+                data=encode_messages(messages, format),
+            ))
+            # By id, so rows added meanwhile (e.g. imported) are not lost
+            for start in range(0, len(messages), DELETE_CHUNK_SIZE):
+                chunk = [message.id for message in messages[start:start + DELETE_CHUNK_SIZE]]
+                await db.execute(delete(Message).filter(
+                    Message.ticket_id == ticket_id, Message.created_at < cutoff, Message.id.in_(chunk)
+                ))
+            await db.commit()
+        for message in messages:
+            ticket_search.remove_message(ticket_id, message.content)
+        return len(messages)
+
+    def may_have_archived(self, ticket_created_at: datetime, after: Optional[MessageKey] = None) -> bool:
+        """
+        Whether a ticket created at `ticket_created_at` can have archived
+        messages after `after`. Only tickets and messages older than the
+        cutoff are archived, so recent tickets and pages need no lookup.
+        """
+        if self.after_days <= 0:
+            return False
+        cutoff = self.cutoff()
+        return ticket_created_at < cutoff and (after is None or after[0] < cutoff)
+
+    async def archived_messages(
+        self,
+        db: AsyncSession,
+        ticket_id: UUID,
+        after: Optional[MessageKey] = None,
+        before: Optional[MessageKey] = None,
+    ) -> List[MessageOut]:
+        """
+        The archived messages of a ticket with keys between `after` and
+        `before` (both exclusive, None for unbounded), oldest first. Only the
+        archives overlapping that range are read.
+        """
+        query = select(MessageArchive.id).filter(MessageArchive.ticket_id == ticket_id)
+        if after:
+            query = query.filter(MessageArchive.last_created_at >= after[0])
+        if before:
+            query = query.filter(MessageArchive.first_created_at <= before[0])
+        archive_ids = (await db.scalars(query)).all()
+        if not archive_ids:
+            return []
+
+        decoded = {archive_id: self._archives.get(archive_id) for archive_id in archive_ids}
+        missing = [archive_id for archive_id, messages in decoded.items() if messages is None]
+        if missing:
+            rows = await db.execute(select(MessageArchive.id, MessageArchive.format, MessageArchive.data).filter(
+                MessageArchive.id.in_(missing)
+            ))
+            for archive_id, format, data in rows:
+                decoded[archive_id] = decode_messages(data, format)
+                self._archives.set(archive_id, decoded[archive_id])
+
+        messages = [
+            message for archived in decoded.values() for message in archived
+            if (after is None or _key(message) > after) and (before is None or _key(message) < before)
+        ]
+        return sorted(messages, key=_key)
+
+
+message_archiver = MessageArchiver(
+    settings.MESSAGE_ARCHIVE_AFTER_DAYS,
+    settings.MESSAGE_ARCHIVE_INTERVAL_SECONDS,
+    settings.MESSAGE_ARCHIVE_BATCH_TICKETS,
+    settings.MESSAGE_ARCHIVE_FORMAT,
+    settings.MESSAGE_ARCHIVE_CACHE_SIZE,
+    settings.MESSAGE_PARTITIONS_AHEAD,
+)
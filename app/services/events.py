@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set
+from uuid import UUID
+
+from pydantic_core import to_json
+
+from app.db.session import engine
+from app.schemas.ticket import MessageOut
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Event types
+TICKET_CREATED = "ticket.created"
+TICKET_UPDATED = "ticket.updated"
+MESSAGE_CREATED = "message.created"
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+
+@dataclass
+class Event:
+    id: str
+    type: str
+    user_id: UUID
+    ticket_id: UUID
+    data: Any
+
+    def payload(self) -> str:
+        """What subscribers receive as the event's data."""
+        return to_json({"ticket_id": self.ticket_id, **self.data}).decode()
+
+    def dumps(self, with_data: bool = True) -> str:
+        return to_json({
+            "id": self.id,
+            "type": self.type,
+            "user_id": self.user_id,
+            "ticket_id": self.ticket_id,
+            "data": self.data if with_data else {"partial": True},
+        }).decode()
+
+    @classmethod
+    def loads(cls, raw: str) -> "Event":
+        fields = json.loads(raw)
+        return cls(fields["id"], fields["type"], UUID(fields["user_id"]), UUID(fields["ticket_id"]), fields["data"])
+
+
+def message_data(message) -> dict:
+    """Event data of a new message row."""
+    return MessageOut.model_validate(message, from_attributes=True).model_dump()
+
+
+class Subscription:
+    """
+    Events for one user, or for one ticket, queued for one client. A client
+    too slow to keep up loses its subscription instead of holding events
+    back for everybody; it resumes from the replay buffer by reconnecting.
+    """
+
+    def __init__(self, broker: "EventBroker", user_id: Optional[UUID], ticket_id: Optional[UUID], maxsize: int):
+        self.broker = broker
+        self.user_id = user_id
+        self.ticket_id = ticket_id
+        self.overflowed = False
+        # True when the requested Last-Event-ID is no longer buffered, so
+        # events may have been missed and the client should reload its state
+        self.reset = False
+        # Replayed events, sent ahead of the queue and not limited by its size
+        self.backlog: Deque[Event] = deque()
+        self._queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize)
+
+    def matches(self, event: Event) -> bool:
+        return (self.user_id is None or event.user_id == self.user_id) and (
+            self.ticket_id is None or event.ticket_id == self.ticket_id
+        )
+
+    def deliver(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.close()
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+        # Drop what is queued (the client replays it) and wake the reader
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def __aiter__(self) -> AsyncIterator[Event]:
+        while self.backlog:
+            yield self.backlog.popleft()
+        while True:
+            event = await self._queue.get()
+            if event is None:
+                return
+            yield event
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe of ticket and message events, with a buffer
+    of recent events so reconnecting clients can resume after the last
+    event they saw (SSE Last-Event-ID).
+
+    With a bridge attached, events are published through it (PostgreSQL
+    LISTEN/NOTIFY) and delivered when they come back, so every worker process
+    sees the events of all workers, in the same order.
+    """
+
+    def __init__(self, replay_size: int, queue_size: int, bridge: Optional["PostgresEventBridge"] = None):
+        self.queue_size = queue_size
+        self.bridge = bridge
+        self._recent: Deque[Event] = deque(maxlen=replay_size)
+        self._by_user: Dict[UUID, Set[Subscription]] = {}
+        self._by_ticket: Dict[UUID, Set[Subscription]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._by_user.values()) + sum(
+            len(subscriptions) for subscriptions in self._by_ticket.values()
+        )
+
+    async def start(self) -> None:
+        if self.bridge is not None:
+            await self.bridge.start(self.dispatch)
+
+    async def stop(self) -> None:
+        if self.bridge is not None:
+            await self.bridge.stop()
+        for subscriptions in list(self._by_user.values()) + list(self._by_ticket.values()):
+            for subscription in list(subscriptions):
+                subscription.close()
+
+    def subscribe(
+        self,
+        user_id: Optional[UUID] = None,
+        ticket_id: Optional[UUID] = None,
+        last_event_id: Optional[str] = None,
+    ) -> Subscription:
+        """
+        Subscribe to the events of a user (optionally of one of their
+        tickets), or to all events of a ticket when `user_id` is None.
+        Buffered events after `last_event_id` are queued first.
+        """
+        subscription = Subscription(self, user_id, ticket_id, self.queue_size)
+        if user_id is not None:
+            self._by_user.setdefault(user_id, set()).add(subscription)
+        else:
+            self._by_ticket.setdefault(ticket_id, set()).add(subscription)
+
+        if last_event_id:
+            ids = [event.id for event in self._recent]
+            if last_event_id in ids:
+                subscription.backlog.extend(
+                    event for event in list(self._recent)[ids.index(last_event_id) + 1:] if subscription.matches(event)
+                )
+            else:
+                subscription.reset = True
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        index, key = (
+            (self._by_user, subscription.user_id)
+            if subscription.user_id is not None
+            else (self._by_ticket, subscription.ticket_id)
+        )
+        subscriptions = index.get(key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del index[key]
+
+    async def publish(self, type: str, user_id: UUID, ticket_id: UUID, data: Any) -> None:
+        """
+        Publish an event about `ticket_id` to its owner `user_id` and to the
+        ticket's subscribers. Never raises: a failing bridge falls back to
+        delivering in this process only.
+        """
+        event = Event(uuid.uuid4().hex, type, user_id, ticket_id, data)
+        if self.bridge is not None:
+            try:
+                await self.bridge.publish(event)
+                return
+            except Exception as e:
+                logger.error(f"Publishing event through the bridge failed: {e}")
+        self.dispatch(event)
+
+    def dispatch(self, event: Event) -> None:
+        self._recent.append(event)
+        for subscription in list(self._by_user.get(event.user_id, ())) + list(self._by_ticket.get(event.ticket_id, ())):
+            if subscription.matches(event):
+                subscription.deliver(event)
+
+
+class PostgresEventBridge:
+    """
+    Shares events between worker processes over PostgreSQL LISTEN/NOTIFY,
+    on a dedicated connection outside the pool. Events published while the
+    connection is down are only delivered locally.
+    """
+
+    def __init__(self, dsn: str, channel: str, reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._connection = None
+        self._task: Optional[asyncio.Task] = None
+        # One connection runs one statement at a time
+        self._lock = asyncio.Lock()
+
+    async def start(self, dispatch) -> None:
+        self._dispatch = dispatch
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        try:
+            self._dispatch(Event.loads(payload))
+        except Exception as e:
+            logger.error(f"Dropping malformed event notification: {e}")
+
+    async def _run(self) -> None:
+        # Imported here: only this bridge needs asyncpg, which SQLite
+        # deployments may not have installed
+        import asyncpg
+
+        while True:
+            closed = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(self.dsn)
+                self._connection.add_termination_listener(lambda connection: closed.set())
+                await self._connection.add_listener(self.channel, self._on_notification)
+                await closed.wait()
+                logger.warning("Event bridge connection lost, reconnecting")
+            except asyncio.CancelledError:
+                if self._connection is not None:
+                    await self._connection.close()
+                raise
+            except Exception as e:
+                logger.error(f"Event bridge connection failed: {e}")
+            finally:
+                self._connection = None
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def publish(self, event: Event) -> None:
+        if self._connection is None:
+            raise ConnectionError("event bridge is not connected")
+        payload = event.dumps()
+        if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+            # Too large for NOTIFY: subscribers get the ids and refetch the rest
+            payload = event.dumps(with_data=False)
+        async with self._lock:
+            await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+
+def create_event_broker() -> EventBroker:
+    bridge = None
+    if settings.EVENTS_BRIDGE == "postgres":
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        bridge = PostgresEventBridge(dsn, settings.EVENTS_CHANNEL)
+    elif settings.EVENTS_BRIDGE != "none":
+        raise ValueError(f"Unknown EVENTS_BRIDGE: {settings.EVENTS_BRIDGE}")
+    return EventBroker(settings.EVENTS_REPLAY_SIZE, settings.EVENTS_SUBSCRIBER_QUEUE_SIZE, bridge)
+
+
+event_broker = create_event_broker()
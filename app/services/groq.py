@@ -1,27 +1,314 @@
-import os
-import requests
-
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-def get_groq_response(prompt: str) -> str:
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 512
-    }
-
-    response = requests.post("https://api.groq.com/openai/v1/chat/completions", json=payload, headers=headers)
-
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"]
-    else:
-        print(f"[GROQ API Error] {response.status_code}: {response.text}")
-        return "I'm sorry, something went wrong."
+import asyncio
+import hashlib
+import json
+import logging
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, List, Optional, Union
+
+import httpx
+
+from app.services.llm_router import LLMProvider, LLMRouter, MockProvider
+from app.services.response_cache import response_cache, cacheable_question, CacheableQuestion
+from app.services.singleflight import SingleFlight, StreamGroup
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class GroqClient(LLMProvider):
+    """
+    Async client for the Groq chat completions API, or any other
+    OpenAI-compatible chat completions endpoint.
+
+    A single `httpx.AsyncClient` is shared by all requests so connections (and
+    their TLS sessions) are kept alive and reused, a semaphore bounds the number
+    of in-flight completions, and 429/5xx responses are retried with
+    exponential backoff that honors Retry-After.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        api_key: str,
+        api_url: str,
+        model: str,
+        connect_timeout: float,
+        read_timeout: float,
+        max_connections: int,
+        max_keepalive_connections: int,
+        http2: bool,
+        max_concurrency: int,
+        max_retries: int,
+        retry_backoff: float,
+    ):
+        self.name = name
+        self.api_key = api_key
+        self.api_url = api_url
+        self.model = model
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.http2 = http2
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "GroqClient":
+        """
+        Build a client from the GROQ_* settings, with `overrides` taking
+        precedence (used for the entries of LLM_PROVIDERS).
+        """
+        options = dict(
+            name="groq",
+            api_key=settings.GROQ_API_KEY,
+            api_url=settings.GROQ_API_URL,
+            model=settings.GROQ_MODEL,
+            connect_timeout=settings.GROQ_CONNECT_TIMEOUT,
+            read_timeout=settings.GROQ_READ_TIMEOUT,
+            max_connections=settings.GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+            http2=settings.GROQ_HTTP2,
+            max_concurrency=settings.GROQ_MAX_CONCURRENCY,
+            max_retries=settings.GROQ_MAX_RETRIES,
+            retry_backoff=settings.GROQ_RETRY_BACKOFF,
+        )
+        options.update(overrides)
+        return cls(**options)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2 and _h2_available(),
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._client
+
+    async def warm_up(self) -> None:
+        # Any response will do: what matters is the connection (and TLS
+        # session) left in the client's pool for the first completion
+        await self.client.head(self.api_url)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _payload(self, messages: Union[str, List[dict]], stream: bool = False) -> dict:
+        # A bare string is sent as a single user turn
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 512
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = _retry_after_seconds(response) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        # Full jitter keeps retries from a burst of callers from lining up
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    async def complete(self, messages: Union[str, List[dict]]) -> str:
+        """
+        Return the full completion for a prompt or a list of chat messages.
+        """
+        payload = self._payload(messages)
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                response = None
+                try:
+                    response = await self.client.post(self.api_url, json=payload)
+                except httpx.TransportError as e:
+                    logger.warning(f"[GROQ API Error] {e!r}")
+                    if attempt == self.max_retries:
+                        raise
+                else:
+                    if response.status_code == 200:
+                        return response.json()["choices"][0]["message"]["content"]
+                    if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                        raise httpx.HTTPStatusError(
+                            f"{response.status_code}: {response.text}",
+                            request=response.request,
+                            response=response,
+                        )
+                await asyncio.sleep(self._backoff(attempt, response))
+
+    async def stream(self, messages: Union[str, List[dict]]) -> AsyncIterator[str]:
+        """
+        Yield content deltas of a streamed completion as they arrive.
+        Retries only happen before the first chunk has been received.
+        """
+        payload = self._payload(messages, stream=True)
+        started = False
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                response = None
+                try:
+                    async with self.client.stream("POST", self.api_url, json=payload) as response:
+                        if response.status_code == 200:
+                            async for content in _iter_sse_content(response):
+                                started = True
+                                yield content
+                            return
+                        await response.aread()
+                        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                            raise httpx.HTTPStatusError(
+                                f"{response.status_code}: {response.text}",
+                                request=response.request,
+                                response=response,
+                            )
+                except httpx.TransportError as e:
+                    logger.warning(f"[GROQ API Error] {e!r}")
+                    if started or attempt == self.max_retries:
+                        raise
+                await asyncio.sleep(self._backoff(attempt, response))
+
+
+async def _iter_sse_content(response: httpx.Response) -> AsyncIterator[str]:
+    async for line in response.aiter_lines():
+        # The API speaks SSE: "data: {...}" lines terminated by "data: [DONE]"
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        delta = json.loads(data)["choices"][0].get("delta", {})
+        content = delta.get("content")
+        if content:
+            yield content
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_providers() -> List[LLMProvider]:
+    """
+    Providers configured in LLM_PROVIDERS, or Groq alone when it is empty.
+    Entries with "type": "mock" create an offline MockProvider.
+    """
+    if not settings.LLM_PROVIDERS:
+        return [GroqClient.from_settings()]
+    providers: List[LLMProvider] = []
+    for config in settings.LLM_PROVIDERS:
+        options = dict(config)
+        if options.pop("type", "openai") == "mock":
+            providers.append(MockProvider(**options))
+        else:
+            providers.append(GroqClient.from_settings(**options))
+    return providers
+
+
+llm_router = LLMRouter(
+    build_providers(),
+    hedge_delay=settings.LLM_HEDGE_DELAY_SECONDS,
+    failure_threshold=settings.LLM_BREAKER_FAILURES,
+    reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+    window=settings.LLM_LATENCY_WINDOW,
+)
+
+# Concurrent identical prompts share one upstream completion or stream
+_inflight_completions: SingleFlight[str] = SingleFlight()
+_inflight_streams = StreamGroup()
+
+
+def _prompt_key(messages: Union[str, List[dict]]) -> str:
+    # The whole prompt, ticket context included: callers only share a
+    # completion when it was built from exactly what they would have sent
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+
+
+async def _complete(messages: Union[str, List[dict]], question: Optional[CacheableQuestion]) -> str:
+    response = await llm_router.complete(messages)
+    if question:
+        response_cache.set(question, response)
+    return response
+
+
+async def _stream(messages: Union[str, List[dict]], question: Optional[CacheableQuestion]) -> AsyncIterator[str]:
+    chunks = []
+    async for content in llm_router.stream(messages):
+        chunks.append(content)
+        yield content
+    if question:
+        response_cache.set(question, "".join(chunks))
+
+
+async def get_groq_response(messages: Union[str, List[dict]]) -> str:
+    """
+    Return the AI reply for `messages`. Raises LLMError when no provider
+    could answer.
+    """
+    question = cacheable_question(messages)
+    if question:
+        cached = response_cache.get(question)
+        if cached is not None:
+            return cached
+
+    return await _inflight_completions.do(_prompt_key(messages), lambda: _complete(messages, question))
+
+
+async def stream_groq_response(messages: Union[str, List[dict]]) -> AsyncIterator[str]:
+    """
+    Stream a completion for `messages`; raises LLMError when no provider could
+    answer or the stream broke off. Cached answers are returned as a single
+    chunk. Callers streaming the same prompt at the same time share one
+    upstream stream, and late joiners first receive the chunks they missed.
+    """
+    question = cacheable_question(messages)
+    if question:
+        cached = response_cache.get(question)
+        if cached is not None:
+            yield cached
+            return
+
+    chunks = _inflight_streams.subscribe(_prompt_key(messages), lambda: _stream(messages, question))
+    try:
+        async for content in chunks:
+            yield content
+    finally:
+        await chunks.aclose()
@@ -0,0 +1,314 @@
+import logging
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.message import Message
+from app.db.models.ticket import Ticket
+from app.db.models.user import User
+from app.schemas.imports import IMPORT_ROW_ADAPTER, MessageImport, TicketImport
+from app.services.prompt_builder import prompt_builder
+from app.services.search import ticket_search
+from app.services.ticket_cache import ticket_cache
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Ticket and user ids known to exist, remembered across the batches of an
+# import so that messages of the same tickets are not checked again
+KNOWN_IDS_CACHE_SIZE = 100_000
+
+# Messages without created_at added to a ticket that already has messages
+# are dated within this long before its first one, so they precede the
+# live conversation instead of interleaving with it
+BACKDATE_WINDOW = timedelta(days=1)
+
+# (line number, column values) of a row ready to be inserted
+Row = Tuple[int, dict]
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], gzipped: bool = False) -> AsyncIterator[bytes]:
+    """
+    Split a streamed request body into lines without reading it whole.
+    """
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    buffer = b""
+    async for chunk in chunks:
+        if decoder is not None:
+            chunk = decoder.decompress(chunk)
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line
+    if decoder is not None:
+        buffer += decoder.flush()
+    if buffer:
+        yield buffer
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+        for err in error.errors(include_url=False)
+    )
+
+
+def _error_text(error: DBAPIError) -> str:
+    # The database's message without the statement and parameters; async
+    # driver adapters keep the original driver exception as the cause
+    orig = error.orig
+    if orig is None:
+        return str(error)
+    return str(orig.__cause__ or orig).strip().splitlines()[0]
+
+
+@dataclass
+class ImportResult:
+    max_errors: int
+    tickets: int = 0
+    messages: int = 0
+    failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def summary(self) -> dict:
+        return {
+            "tickets": self.tickets,
+            "messages": self.messages,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+class BulkImporter:
+    """
+    Loads an NDJSON stream of tickets and messages: each line is validated
+    as it arrives, and valid rows are inserted in batches of `batch_size`,
+    one transaction per batch, with a multi-row INSERT (or COPY on
+    PostgreSQL). No AI replies are generated.
+
+    A message may refer to an existing ticket or to one imported earlier in
+    the stream. When a batch is rejected by the database it is retried row
+    by row, so only the offending rows are reported as errors.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        owner_id: UUID,
+        batch_size: int,
+        max_errors: int,
+        use_copy: bool = False,
+    ):
+        self.db = db
+        self.owner_id = owner_id
+        self.batch_size = max(batch_size, 1)
+        self.use_copy = use_copy and db.bind.dialect.name == "postgresql"
+        self.result = ImportResult(max_errors)
+        self._known_users = TTLCache(KNOWN_IDS_CACHE_SIZE, float("inf"))
+        self._known_tickets = TTLCache(KNOWN_IDS_CACHE_SIZE, float("inf"))
+        self._known_users.set(owner_id, True)
+        self._started = datetime.utcnow()
+        # Tickets created by this import, and for the existing tickets that
+        # get undated messages: their first message before the import (None
+        # when they had none) and how many messages were dated before it
+        self._imported_tickets: Set[UUID] = set()
+        self._first_messages: Dict[UUID, Optional[datetime]] = {}
+        self._backdated: Dict[UUID, int] = {}
+
+    def _created_at(self, number: int, created_at: Optional[datetime]) -> datetime:
+        # Rows without created_at keep their order in the file, one
+        # microsecond apart, so history pages them in the order given
+        return created_at or self._started + timedelta(microseconds=number)
+
+    async def _date_messages(self, messages: List[Row]) -> None:
+        """
+        Date the messages without created_at, in file order: before the
+        first message of a ticket that already had some, else from the
+        start of the import.
+        """
+        undated = [values for _, values in messages if values["created_at"] is None]
+        lookup = {values["ticket_id"] for values in undated} - self._imported_tickets - self._first_messages.keys()
+        if lookup:
+            self._first_messages.update(dict.fromkeys(lookup))
+            self._first_messages.update((await self.db.execute(
+                select(Message.ticket_id, func.min(Message.created_at))
+                .filter(Message.ticket_id.in_(lookup))
+                .group_by(Message.ticket_id)
+            )).all())
+        for number, values in messages:
+            if values["created_at"] is not None:
+                continue
+            ticket_id = values["ticket_id"]
+            first = self._first_messages.get(ticket_id)
+            if first is None:
+                values["created_at"] = self._created_at(number, None)
+            else:
+                self._backdated[ticket_id] = self._backdated.get(ticket_id, 0) + 1
+                values["created_at"] = first - BACKDATE_WINDOW + timedelta(microseconds=self._backdated[ticket_id])
+
+    async def run(self, lines: AsyncIterator[bytes]) -> ImportResult:
+        batch: List[Tuple[int, object]] = []
+        number = 0
+        async for line in lines:
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                batch.append((number, IMPORT_ROW_ADAPTER.validate_json(line)))
+            except ValidationError as e:
+                self.result.error(number, _describe(e))
+                continue
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+        return self.result
+
+    async def _flush(self, batch: List[Tuple[int, object]]) -> None:
+        tickets: List[Row] = []
+        messages: List[Row] = []
+        for number, row in batch:
+            if isinstance(row, TicketImport):
+                tickets.append((number, {
+                    "id": row.id or uuid.uuid4(),
+                    "title": row.title,
+                    "description": row.description,
+                    "status": row.status,
+                    "created_at": self._created_at(number, row.created_at),
+                    "user_id": row.user_id or self.owner_id,
+                }))
+            elif isinstance(row, MessageImport):
+                messages.append((number, {
+                    "id": row.id or uuid.uuid4(),
+                    "content": row.content,
+                    "is_ai": row.is_ai,
+                    "created_at": row.created_at,
+                    "ticket_id": row.ticket_id,
+                }))
+
+        tickets = await self._with_known(tickets, "user_id", User, self._known_users, "unknown user_id")
+        new_tickets = {values["id"] for _, values in tickets}
+        self._imported_tickets |= new_tickets
+        messages = await self._with_known(
+            messages, "ticket_id", Ticket, self._known_tickets, "unknown ticket_id", also_known=new_tickets
+        )
+        await self._date_messages(messages)
+
+        try:
+            await self._insert(Ticket, [values for _, values in tickets])
+            await self._insert(Message, [values for _, values in messages])
+            await self.db.commit()
+        except DBAPIError as e:
+            await self.db.rollback()
+            logger.warning(f"Import batch rejected, retrying row by row: {_error_text(e)}")
+            tickets, messages = await self._insert_rows(tickets, messages)
+
+        for _, values in tickets:
+            self._known_tickets.set(values["id"], True)
+            ticket_search.add_ticket(values["id"], values["user_id"], values["title"], values["description"])
+        for _, values in messages:
+            ticket_search.add_message(values["ticket_id"], values["content"])
+        self.result.tickets += len(tickets)
+        self.result.messages += len(messages)
+
+        # Messages added to tickets that already existed change what their
+        # cached prompt history and ticket payload should contain
+        for ticket_id in {values["ticket_id"] for _, values in messages} - new_tickets:
+            prompt_builder.invalidate(ticket_id)
+            await ticket_cache.invalidate(ticket_id)
+
+    async def _with_known(
+        self,
+        rows: List[Row],
+        column: str,
+        model,
+        known: TTLCache,
+        error: str,
+        also_known: Iterable[UUID] = (),
+    ) -> List[Row]:
+        """
+        Drop (and report) the rows whose `column` refers to no `model` row.
+        """
+        also_known = set(also_known)
+        wanted: Set[UUID] = {values[column] for _, values in rows} - also_known
+        unknown = {value for value in wanted if known.get(value) is None}
+        if unknown:
+            found = set(await self.db.scalars(select(model.id).filter(model.id.in_(unknown))))
+            for value in found:
+                known.set(value, True)
+            unknown -= found
+
+        kept = []
+        for number, values in rows:
+            if values[column] in unknown:
+                self.result.error(number, f"{error} {values[column]}")
+            else:
+                kept.append((number, values))
+        return kept
+
+    async def _insert(self, model, rows: List[dict]) -> None:
+        if not rows:
+            return
+        if not self.use_copy:
+            # executemany: batched into multi-row INSERTs / pipelined by the driver
+            await self.db.execute(insert(model), rows)
+            return
+
+        connection = await self.db.connection()
+        driver = (await connection.get_raw_connection()).driver_connection
+        if not driver.is_in_transaction():
+            # The driver adapter begins its transaction lazily with the first
+            # statement; COPY has to run inside it to be rolled back with the batch
+            await connection.exec_driver_sql("SELECT 1")
+        columns = list(rows[0])
+        try:
+            await driver.copy_records_to_table(
+                model.__tablename__,
+                records=[tuple(values[column] for column in columns) for values in rows],
+                columns=columns,
+            )
+        except Exception as e:
+            # Raised by the driver itself, bypassing SQLAlchemy's wrapping
+            raise DBAPIError(f"COPY {model.__tablename__}", None, e) from e
+
+    async def _insert_rows(self, tickets: List[Row], messages: List[Row]) -> Tuple[List[Row], List[Row]]:
+        """
+        Insert rows one at a time, each in a savepoint, reporting those the
+        database rejects. Returns the rows that were inserted.
+        """
+        inserted: Dict[type, List[Row]] = {Ticket: [], Message: []}
+        failed_tickets: Set[UUID] = set()
+        for model, rows in ((Ticket, tickets), (Message, messages)):
+            if model is Message and failed_tickets:
+                # A ticket rejected as a duplicate exists, so its messages can still go in
+                failed_tickets -= set(await self.db.scalars(select(Ticket.id).filter(Ticket.id.in_(failed_tickets))))
+            for number, values in rows:
+                if model is Message and values["ticket_id"] in failed_tickets:
+                    self.result.error(number, f"ticket {values['ticket_id']} was not imported")
+                    continue
+                try:
+                    async with self.db.begin_nested():
+                        await self.db.execute(insert(model), [values])
+                except DBAPIError as e:
+                    self.result.error(number, _error_text(e))
+                    if model is Ticket:
+                        failed_tickets.add(values["id"])
+                else:
+                    inserted[model].append((number, values))
+        await self.db.commit()
+        return inserted[Ticket], inserted[Message]
@@ -0,0 +1,417 @@
+import asyncio
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple, Union
+
+from app.services.prompt_builder import estimate_tokens
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+Messages = Union[str, List[dict]]
+
+COMPLETE = "complete"
+STREAM = "stream"
+
+
+class LLMError(Exception):
+    """Raised when no provider could produce a reply."""
+
+    retry_after: float = 1.0
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling upstream when every provider's circuit is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"All LLM providers are unavailable, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class LLMProvider(ABC):
+    """
+    A chat completion backend. `stream` yields content deltas; both methods
+    raise on failure so the router can fail over.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def complete(self, messages: Messages) -> str:
+        ...
+
+    @abstractmethod
+    def stream(self, messages: Messages) -> AsyncIterator[str]:
+        ...
+
+    async def warm_up(self) -> None:
+        """Open connections ahead of the first request, where that applies."""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class MockProvider(LLMProvider):
+    """
+    Offline provider that answers after a configurable latency, for local
+    development and load tests. `failure_rate` makes a share of calls fail.
+    """
+
+    def __init__(
+        self,
+        name: str = "mock",
+        latency: float = 0.2,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        reply: str = "Thanks for reaching out! This is a mock reply from the support assistant.",
+    ):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.reply = reply
+
+    async def _wait(self) -> None:
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if random.random() < self.failure_rate:
+            raise LLMError(f"{self.name}: simulated failure")
+
+    async def complete(self, messages: Messages) -> str:
+        await self._wait()
+        return self.reply
+
+    async def stream(self, messages: Messages) -> AsyncIterator[str]:
+        await self._wait()
+        for word in self.reply.split(" "):
+            yield word + " "
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; once `reset_timeout`
+    seconds have passed a single probe call is let through, and its outcome
+    closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through."""
+        if self.opened_at is None:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._probing)
+
+    def allow(self) -> bool:
+        """Call right before using the provider; claims the probe when half open."""
+        if not self.available():
+            return False
+        if self.state == "half_open":
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """Give back an unused probe, e.g. when the call was cancelled."""
+        self._probing = False
+
+
+class ProviderStats:
+    """
+    Sliding windows of the latest latencies (full reply for completions, time
+    to first token for streams) and call outcomes of one provider.
+    """
+
+    def __init__(self, window: int):
+        self.latencies: Dict[str, Deque[float]] = {COMPLETE: deque(maxlen=window), STREAM: deque(maxlen=window)}
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+
+    def record(self, kind: str, latency: Optional[float], ok: bool) -> None:
+        if ok and latency is not None:
+            self.latencies[kind].append(latency)
+        self.outcomes.append(ok)
+
+    def record_abandoned(self, kind: str, latency: float) -> None:
+        # A call cancelled after losing a hedge took at least this long; keeping
+        # it as a sample stops the slow provider from staying ranked first
+        self.latencies[kind].append(latency)
+
+    def percentile(self, kind: str, q: float) -> Optional[float]:
+        samples = sorted(self.latencies[kind])
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def score(self, kind: str) -> float:
+        """
+        Expected latency, inflated by the error rate to account for failing
+        over. Providers without samples score 0 so they are tried and measured.
+        """
+        p50, p95 = self.percentile(kind, 0.5), self.percentile(kind, 0.95)
+        if p50 is None:
+            return 0.0
+        return ((p50 + p95) / 2) / max(1.0 - self.error_rate, 0.1)
+
+
+def _prompt_tokens(messages: Messages) -> int:
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+class _Backend:
+    def __init__(self, provider: LLMProvider, breaker: CircuitBreaker, stats: ProviderStats):
+        self.provider = provider
+        self.breaker = breaker
+        self.stats = stats
+
+
+class LLMRouter:
+    """
+    Routes AI requests across providers. Healthy providers are ranked by
+    observed latency and error rate; failed calls fall over to the next one,
+    and providers failing repeatedly are skipped by their circuit breaker
+    until a probe succeeds.
+
+    With `hedge_delay` > 0 a second provider is started when the first has
+    not answered (or, for streams, produced its first token) within that many
+    seconds, and whichever answers first wins.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        hedge_delay: float = 0.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        window: int = 100,
+    ):
+        self.hedge_delay = hedge_delay
+        self._backends = [
+            _Backend(provider, CircuitBreaker(failure_threshold, reset_timeout), ProviderStats(window))
+            for provider in providers
+        ]
+
+    @property
+    def providers(self) -> List[LLMProvider]:
+        return [backend.provider for backend in self._backends]
+
+    def snapshot(self) -> List[dict]:
+        """Per-provider health for monitoring."""
+        return [
+            {
+                "name": backend.provider.name,
+                "circuit": backend.breaker.state,
+                "error_rate": backend.stats.error_rate,
+                "p50": backend.stats.percentile(COMPLETE, 0.5),
+                "p95": backend.stats.percentile(COMPLETE, 0.95),
+                "ttft_p50": backend.stats.percentile(STREAM, 0.5),
+                "ttft_p95": backend.stats.percentile(STREAM, 0.95),
+            }
+            for backend in self._backends
+        ]
+
+    def _ranked(self, kind: str) -> List[_Backend]:
+        available = [backend for backend in self._backends if backend.breaker.available()]
+        if not available:
+            raise LLMUnavailable(min(backend.breaker.retry_after for backend in self._backends))
+        # sorted() is stable, so ties keep the configured order
+        return sorted(available, key=lambda backend: backend.stats.score(kind))
+
+    @staticmethod
+    def _count(backend: _Backend, kind: str, outcome: str) -> None:
+        metrics.LLM_REQUESTS.inc(provider=backend.provider.name, kind=kind, outcome=outcome)
+
+    async def _call(self, backend: _Backend, messages: Messages) -> str:
+        name = backend.provider.name
+        started = time.monotonic()
+        try:
+            reply = await backend.provider.complete(messages)
+        except asyncio.CancelledError:
+            backend.stats.record_abandoned(COMPLETE, time.monotonic() - started)
+            backend.breaker.release()
+            self._count(backend, COMPLETE, "cancelled")
+            raise
+        except Exception as e:
+            logger.warning(f"[LLM] {name} failed: {e!r}")
+            backend.stats.record(COMPLETE, None, False)
+            backend.breaker.record_failure()
+            self._count(backend, COMPLETE, "error")
+            raise
+        elapsed = time.monotonic() - started
+        backend.stats.record(COMPLETE, elapsed, True)
+        backend.breaker.record_success()
+        self._count(backend, COMPLETE, "success")
+        metrics.LLM_DURATION.observe(elapsed, provider=name, kind=COMPLETE)
+        metrics.LLM_TOKENS.inc(_prompt_tokens(messages), provider=name, type="prompt")
+        metrics.LLM_TOKENS.inc(estimate_tokens(reply), provider=name, type="completion")
+        return reply
+
+    async def _open_stream(
+        self, backend: _Backend, messages: Messages
+    ) -> Tuple[AsyncIterator[str], Optional[str], float]:
+        # Waits for the first chunk, so the race between hedged streams is
+        # decided by time to first token
+        started = time.monotonic()
+        chunks = backend.provider.stream(messages)
+        try:
+            first = await chunks.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except asyncio.CancelledError:
+            backend.stats.record_abandoned(STREAM, time.monotonic() - started)
+            backend.breaker.release()
+            self._count(backend, STREAM, "cancelled")
+            raise
+        except Exception as e:
+            logger.warning(f"[LLM] {backend.provider.name} failed: {e!r}")
+            backend.stats.record(STREAM, None, False)
+            backend.breaker.record_failure()
+            self._count(backend, STREAM, "error")
+            raise
+        time_to_first_token = time.monotonic() - started
+        backend.stats.record(STREAM, time_to_first_token, True)
+        backend.breaker.record_success()
+        metrics.LLM_TIME_TO_FIRST_TOKEN.observe(time_to_first_token, provider=backend.provider.name)
+        return chunks, first, started
+
+    async def _race(self, kind: str, start, discard=None) -> Tuple[_Backend, object]:
+        """
+        Run `start(backend)` on providers in rank order: the next one is
+        started when the running ones have all failed, or as a hedge when
+        `hedge_delay` passes without a result. Returns the first success;
+        `discard` is awaited on any other result that completed meanwhile.
+        """
+        candidates = self._ranked(kind)
+        running: Dict[asyncio.Task, _Backend] = {}
+        errors: List[BaseException] = []
+        hedged = False
+
+        def start_next() -> bool:
+            while candidates:
+                backend = candidates.pop(0)
+                if backend.breaker.allow():
+                    running[asyncio.ensure_future(start(backend))] = backend
+                    return True
+            return False
+
+        try:
+            start_next()
+            while running:
+                can_hedge = self.hedge_delay > 0 and not hedged and len(running) == 1 and candidates
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    hedged = start_next()
+                    continue
+                for task in done:
+                    backend = running.pop(task)
+                    if task.exception() is None:
+                        return backend, task.result()
+                    errors.append(task.exception())
+                if not running:
+                    start_next()
+        finally:
+            for task in running:
+                task.cancel()
+            results = await asyncio.gather(*running, return_exceptions=True)
+            if discard is not None:
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result)
+
+        raise LLMError(f"All LLM providers failed: {errors!r}")
+
+    async def complete(self, messages: Messages) -> str:
+        _, reply = await self._race(COMPLETE, lambda backend: self._call(backend, messages))
+        return reply
+
+    async def stream(self, messages: Messages) -> AsyncIterator[str]:
+        """
+        Yield content deltas from the first provider to produce a token.
+        Failover and hedging only happen before that first token.
+        """
+        async def discard(opened: Tuple[AsyncIterator[str], Optional[str], float]) -> None:
+            await opened[0].aclose()
+
+        backend, (chunks, first, started) = await self._race(
+            STREAM, lambda backend: self._open_stream(backend, messages), discard
+        )
+        name = backend.provider.name
+        completion_tokens = 0
+        outcome = "cancelled"
+        try:
+            if first is not None:
+                completion_tokens += estimate_tokens(first)
+                yield first
+                async for chunk in chunks:
+                    completion_tokens += estimate_tokens(chunk)
+                    yield chunk
+            outcome = "success"
+            metrics.LLM_DURATION.observe(time.monotonic() - started, provider=name, kind=STREAM)
+        except Exception as e:
+            # Failing midway still counts against the provider
+            outcome = "error"
+            backend.stats.record(STREAM, None, False)
+            backend.breaker.record_failure()
+            raise LLMError(f"{name} failed mid-stream: {e!r}") from e
+        finally:
+            await chunks.aclose()
+            self._count(backend, STREAM, outcome)
+            metrics.LLM_TOKENS.inc(_prompt_tokens(messages), provider=name, type="prompt")
+            metrics.LLM_TOKENS.inc(completion_tokens, provider=name, type="completion")
+
+    async def warm_up(self) -> None:
+        """
+        Connect to every provider at once. Failures are only logged: the
+        provider then connects on first use, as without warm-up.
+        """
+        results = await asyncio.gather(
+            *(backend.provider.warm_up() for backend in self._backends), return_exceptions=True
+        )
+        for backend, result in zip(self._backends, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Warming up LLM provider {backend.provider.name} failed: {result}")
+
+    async def aclose(self) -> None:
+        for backend in self._backends:
+            await backend.provider.aclose()
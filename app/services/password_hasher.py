@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app.utils import metrics
+from app.utils.config import settings
+from app.utils.security import get_password_hash, password_context, verify_and_update_password
+
+logger = logging.getLogger(__name__)
+
+
+def _loaded() -> None:
+    """Run in each pool process by warm_up; unpickling it imports this module."""
+    password_context()
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when too many hash/verify calls are already waiting for the pool,
+    or the pool broke again right after being replaced.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small dedicated process pool so its CPU cost neither holds
+    the GIL of the API worker nor occupies its threadpool. Calls beyond
+    `max_pending` are rejected instead of queueing without bound.
+
+    A pool process that dies (OOM kill, crash) breaks the whole executor;
+    it is then discarded, recreated on next use, and the call retried once.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn rather than fork: children must not inherit the event loop,
+            # open sockets or the threads of the API process
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def _run(self, operation: str, fn, *args):
+        if self._pending >= self.max_pending:
+            metrics.PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHasherBusy()
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            for attempt in range(2):
+                executor = self.executor
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+                except BrokenProcessPool as e:
+                    logger.error(f"Password hashing pool broke, restarting it: {e}")
+                    self._discard(executor)
+            raise PasswordHasherBusy()
+        finally:
+            self._pending -= 1
+            metrics.PASSWORD_HASH_DURATION.observe(time.perf_counter() - started, operation=operation)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run("verify", verify_and_update_password, password, hashed_password)
+
+    async def warm_up(self) -> None:
+        """
+        Start the pool processes now: spawning them and importing passlib
+        and bcrypt takes long enough to be felt by the first signups and logins.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _loaded) for _ in range(self.workers)))
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        # Calls failing together all report the same broken pool; only the
+        # first replaces it
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,187 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.message import Message
+from app.db.models.ticket import Ticket
+from app.schemas.ticket import TicketOut
+from app.utils.cache import TTLCache
+from app.utils.config import settings
+
+# Words are counted in pieces of up to four characters and every punctuation
+# mark as one token, which tracks BPE tokenizers closely enough for budgeting
+_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# Tokens the chat format spends on each message besides its content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Share of the budget given to the summary of turns that no longer fit
+SUMMARY_BUDGET_RATIO = 0.1
+SUMMARY_LINE_CHARS = 160
+SUMMARY_HEADER = "Summary of earlier messages in this conversation:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local estimate of the number of tokens in `text`.
+    """
+    return len(_TOKEN_PATTERN.findall(text or ""))
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokens = _TOKEN_PATTERN.finditer(text)
+    for i, match in enumerate(tokens):
+        if i == max_tokens:
+            return text[:match.start()].rstrip() + " ..."
+    return text
+
+
+@dataclass
+class _Turn:
+    role: str
+    content: str
+    tokens: int
+
+    @property
+    def cost(self) -> int:
+        return self.tokens + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class _History:
+    turns: List[_Turn]
+    # (created_at, id) of the newest message included in `turns`
+    last_key: Optional[Tuple[datetime, UUID]]
+
+
+class PromptBuilder:
+    """
+    Assembles the chat messages sent to the LLM for a ticket: a system prompt
+    with the ticket's title and description followed by the most recent
+    conversation turns, fitted into a token budget. Turns that do not fit are
+    replaced by a short extractive summary.
+
+    Each ticket's tokenized history is cached, so building the prompt for a
+    new turn only fetches messages newer than the cached ones.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        token_budget: int,
+        history_limit: int,
+        cache_size: int,
+        cache_ttl: float,
+    ):
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.history_limit = history_limit
+        self._cache = TTLCache(cache_size, cache_ttl)
+
+    @property
+    def cache(self) -> TTLCache:
+        return self._cache
+
+    def invalidate(self, ticket_id: UUID) -> None:
+        """
+        Forget a ticket's cached history, e.g. after messages were added out
+        of order, which the incremental fetch would not pick up.
+        """
+        self._cache.delete(ticket_id)
+
+    async def _history(self, db: AsyncSession, ticket_id: UUID) -> _History:
+        cached: Optional[_History] = self._cache.get(ticket_id)
+
+        query = select(Message.id, Message.content, Message.is_ai, Message.created_at).filter(
+            Message.ticket_id == ticket_id
+        )
+        if cached and cached.last_key:
+            query = query.filter(tuple_(Message.created_at, Message.id) > tuple_(*cached.last_key))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(self.history_limit)
+        rows = list(reversed((await db.execute(query)).all()))
+
+        turns = list(cached.turns) if cached else []
+        turns.extend(
+            _Turn("assistant" if row.is_ai else "user", row.content or "", estimate_tokens(row.content))
+            for row in rows
+        )
+        last_key = (rows[-1].created_at, rows[-1].id) if rows else (cached.last_key if cached else None)
+
+        history = _History(turns[-self.history_limit:], last_key)
+        self._cache.set(ticket_id, history)
+        return history
+
+    def _system_message(self, ticket: Union[Ticket, TicketOut]) -> str:
+        return (
+            f"{self.system_prompt}\n\n"
+            f"Ticket title: {ticket.title}\n"
+            f"Ticket description: {ticket.description}"
+        )
+
+    def _summarize(self, dropped: List[_Turn], budget: int) -> Optional[str]:
+        # Keep the first sentence of the most recent dropped turns
+        lines: List[str] = []
+        used = estimate_tokens(SUMMARY_HEADER)
+        for turn in reversed(dropped):
+            first_sentence = _SENTENCE_END.split(turn.content.strip(), 1)[0][:SUMMARY_LINE_CHARS]
+            line = f"- {turn.role}: {first_sentence}"
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        if not lines:
+            return None
+        return SUMMARY_HEADER + "\n".join(reversed(lines))
+
+    async def build(self, db: AsyncSession, ticket: Union[Ticket, TicketOut]) -> List[dict]:
+        """
+        Return the chat messages for the next AI reply on `ticket`.
+        """
+        history = await self._history(db, ticket.id)
+        system = self._system_message(ticket)
+        budget = self.token_budget - estimate_tokens(system) - MESSAGE_OVERHEAD_TOKENS
+
+        turns = history.turns
+        if sum(turn.cost for turn in turns) > budget:
+            summary_budget = int(self.token_budget * SUMMARY_BUDGET_RATIO)
+            available = budget - summary_budget - MESSAGE_OVERHEAD_TOKENS
+
+            kept: List[_Turn] = []
+            used = 0
+            for turn in reversed(turns):
+                if used + turn.cost > available:
+                    break
+                kept.append(turn)
+                used += turn.cost
+
+            if not kept and turns:
+                # The latest message alone exceeds the budget; keep its beginning
+                latest = turns[-1]
+                content = _truncate_to_tokens(latest.content, max(available - MESSAGE_OVERHEAD_TOKENS, 1))
+                kept.append(_Turn(latest.role, content, estimate_tokens(content)))
+
+            kept.reverse()
+            summary = self._summarize(turns[:len(turns) - len(kept)], summary_budget)
+            if summary:
+                system = f"{system}\n\n{summary}"
+            turns = kept
+
+        return [{"role": "system", "content": system}] + [
+            {"role": turn.role, "content": turn.content} for turn in turns
+        ]
+
+
+prompt_builder = PromptBuilder(
+    system_prompt=settings.AI_SYSTEM_PROMPT,
+    token_budget=settings.AI_CONTEXT_TOKEN_BUDGET,
+    history_limit=settings.AI_CONTEXT_HISTORY_LIMIT,
+    cache_size=settings.AI_CONTEXT_CACHE_SIZE,
+    cache_ttl=settings.AI_CONTEXT_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Tuple
+from uuid import UUID
+
+from app.utils.config import settings
+
+
+class RateLimited(Exception):
+    """Raised when a caller has used up its token bucket."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class LLMBusy(Exception):
+    """Raised when no LLM slot frees up within the admission wait."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM capacity exhausted, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage for token buckets. Implementations shared between worker processes
+    (e.g. Redis with a Lua script) must take tokens atomically.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        """
+        Take one token from the bucket `key`, refilled at `rate` tokens per
+        second up to `capacity`. Return 0 when a token was taken, otherwise the
+        seconds until one will be available.
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets kept in this process; limits apply per worker.
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        # Least recently seen buckets are dropped first; they are likely full again
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RateLimiter:
+    """
+    Per-user token bucket: `per_minute` requests on average with bursts of up
+    to `burst`. A `per_minute` of 0 disables the limiter.
+    """
+
+    def __init__(self, backend: RateLimitBackend, per_minute: float, burst: int, prefix: str = "ratelimit"):
+        self.backend = backend
+        self.rate = per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self.prefix = prefix
+
+    async def check(self, user_id: UUID) -> None:
+        if self.rate <= 0:
+            return
+        retry_after = await self.backend.take(f"{self.prefix}:{user_id}", self.rate, self.capacity)
+        if retry_after > 0:
+            raise RateLimited(retry_after)
+
+
+class ConcurrencyLimiter:
+    """
+    Bounds the LLM calls outstanding in this worker. Callers beyond
+    `max_concurrent` wait up to `wait_timeout` seconds in a queue of at most
+    `max_waiting`; anyone who cannot be queued or times out is rejected at
+    once with LLMBusy rather than piling up behind a saturated upstream.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int, wait_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+
+    @property
+    def in_use(self) -> int:
+        return self.max_concurrent - self._semaphore._value
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    async def acquire(self) -> None:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self._waiting >= self.max_waiting:
+            raise LLMBusy(self.wait_timeout)
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise LLMBusy(self.wait_timeout)
+        finally:
+            self._waiting -= 1
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+message_rate_limiter = RateLimiter(
+    InMemoryRateLimitBackend(),
+    per_minute=settings.RATE_LIMIT_MESSAGES_PER_MINUTE,
+    burst=settings.RATE_LIMIT_MESSAGES_BURST,
+    prefix="ratelimit:messages",
+)
+
+llm_limiter = ConcurrencyLimiter(
+    max_concurrent=settings.LLM_MAX_CONCURRENT_REQUESTS,
+    max_waiting=settings.LLM_MAX_WAITING_REQUESTS,
+    wait_timeout=settings.LLM_ADMISSION_TIMEOUT,
+)
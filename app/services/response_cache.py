@@ -0,0 +1,214 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from app.utils.cache import TTLCache
+from app.utils.config import settings
+
+# numpy, once the similarity tier is first used
+np = None
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Lowercase `text` and reduce it to its words, so trivial differences in
+    punctuation, casing or spacing map to the same cache entry.
+    """
+    return " ".join(_WORD_PATTERN.findall(text.lower()))
+
+
+def _load_numpy() -> None:
+    # Imported on first use rather than with the app: it is optional, and
+    # slow enough to import to count against the startup budget
+    global np
+    if np is None:
+        np = importlib.import_module("numpy")
+
+
+class CacheableQuestion(NamedTuple):
+    # Everything the answer depends on besides the question: the system
+    # turns, which hold the ticket's title and description
+    context: str
+    question: str
+
+
+def cacheable_question(messages: Union[str, List[dict]]) -> Optional[CacheableQuestion]:
+    """
+    Return the user's question, with its context, when `messages` opens a
+    conversation. Answers to follow-up turns depend on the conversation and
+    are never cached.
+    """
+    if isinstance(messages, str):
+        return CacheableQuestion("", messages)
+    turns = [message for message in messages if message["role"] != "system"]
+    if len(turns) == 1 and turns[0]["role"] == "user":
+        context = [message for message in messages if message["role"] == "system"]
+        return CacheableQuestion(json.dumps(context, sort_keys=True), turns[0]["content"])
+    return None
+
+
+@dataclass
+class ResponseCacheStats:
+    exact_hits: int = 0
+    similar_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.exact_hits + self.similar_hits + self.misses
+        return (self.exact_hits + self.similar_hits) / total if total else 0.0
+
+
+class _VectorIndex:
+    """
+    Fixed-capacity nearest-neighbour index over hashed word and character
+    trigram vectors, each tagged with the id of its question's context. Rows
+    are overwritten oldest first once the index is full.
+    """
+
+    def __init__(self, capacity: int, dimensions: int):
+        _load_numpy()
+        self.capacity = capacity
+        self.dimensions = dimensions
+        self._matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._contexts = np.zeros(capacity, dtype=np.int64)
+        self._keys: List[Optional[str]] = [None] * capacity
+        self._slots: Dict[str, int] = {}
+        self._next = 0
+
+    def vectorize(self, text: str) -> "np.ndarray":
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        features = text.split() + [text[i:i + 3] for i in range(len(text) - 2)]
+        # crc32 rather than hash() so vectors do not depend on hash randomization
+        buckets = [zlib.crc32(feature.encode()) % self.dimensions for feature in features]
+        np.add.at(vector, buckets, 1.0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, key: str, context_id: int, vector: "np.ndarray") -> None:
+        if key in self._slots:
+            return
+        slot = self._next
+        evicted = self._keys[slot]
+        if evicted is not None:
+            del self._slots[evicted]
+        self._matrix[slot] = vector
+        self._contexts[slot] = context_id
+        self._keys[slot] = key
+        self._slots[key] = slot
+        self._next = (slot + 1) % self.capacity
+
+    def remove(self, key: str) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            self._matrix[slot] = 0.0
+            self._keys[slot] = None
+
+    def nearest(self, context_id: int, vector: "np.ndarray") -> Tuple[Optional[str], float]:
+        """The most similar question asked in the same context, and its similarity."""
+        # Rows and query are unit length, so the dot product is the cosine similarity
+        scores = np.where(self._contexts == context_id, self._matrix @ vector, -1.0)
+        slot = int(np.argmax(scores))
+        return self._keys[slot], float(scores[slot])
+
+
+class ResponseCache:
+    """
+    Caches AI answers to opening questions of a conversation.
+
+    Answers are written from the ticket details in the system turns, so
+    every lookup is scoped to the question's context: a question asked on
+    another ticket never gets this ticket's answer. The exact tier is keyed
+    by a hash of the context and the normalized question. The optional
+    similarity tier (requires numpy) returns the answer of the most similar
+    question cached in the same context when its cosine similarity reaches
+    `similarity_threshold`. Both tiers share one TTL + LRU store of answers.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        similarity_threshold: float,
+        similarity_enabled: bool,
+        dimensions: int = 512,
+    ):
+        self.enabled = maxsize > 0
+        self.similarity_threshold = similarity_threshold
+        self.stats = ResponseCacheStats()
+        self.dimensions = dimensions
+        self._responses = TTLCache(maxsize, ttl)
+        self._index: Optional[_VectorIndex] = None
+        self._similarity = similarity_enabled and self.enabled
+        if self._similarity and importlib.util.find_spec("numpy") is None:
+            logger.warning("numpy is not installed; the similarity tier of the response cache is disabled")
+            self._similarity = False
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def _vector_index(self) -> Optional[_VectorIndex]:
+        # Built on first use, so numpy is only imported when it is needed
+        if self._index is None and self._similarity:
+            self._index = _VectorIndex(self._responses.maxsize, self.dimensions)
+        return self._index
+
+    @staticmethod
+    def _key(context: str, normalized: str) -> str:
+        return hashlib.sha256(f"{context}\0{normalized}".encode()).hexdigest()
+
+    @staticmethod
+    def _context_id(context: str) -> int:
+        return int.from_bytes(hashlib.sha256(context.encode()).digest()[:8], "big", signed=True)
+
+    def get(self, question: CacheableQuestion) -> Optional[str]:
+        if not self.enabled:
+            return None
+        normalized = normalize_prompt(question.question)
+        key = self._key(question.context, normalized)
+
+        response = self._responses.get(key)
+        if response is not None:
+            self.stats.exact_hits += 1
+            return response
+
+        index = self._vector_index()
+        if index is not None and normalized:
+            similar_key, score = index.nearest(self._context_id(question.context), index.vectorize(normalized))
+            if similar_key is not None and score >= self.similarity_threshold:
+                response = self._responses.get(similar_key)
+                if response is not None:
+                    self.stats.similar_hits += 1
+                    return response
+                # The answer expired or was evicted; forget its vector as well
+                index.remove(similar_key)
+
+        self.stats.misses += 1
+        return None
+
+    def set(self, question: CacheableQuestion, response: str) -> None:
+        if not self.enabled:
+            return
+        normalized = normalize_prompt(question.question)
+        key = self._key(question.context, normalized)
+        self._responses.set(key, response)
+        index = self._vector_index()
+        if index is not None and normalized:
+            index.add(key, self._context_id(question.context), index.vectorize(normalized))
+
+
+response_cache = ResponseCache(
+    maxsize=settings.RESPONSE_CACHE_MAX_SIZE if settings.RESPONSE_CACHE_ENABLED else 0,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    similarity_enabled=settings.RESPONSE_CACHE_SIMILARITY_ENABLED,
+)
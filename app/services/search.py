@@ -0,0 +1,223 @@
+import asyncio
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import event, func, literal_column, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models.message import Message, MESSAGE_SEARCH_DOCUMENT
+from app.db.models.ticket import Ticket, TICKET_SEARCH_DOCUMENT
+from app.db.session import engine
+from app.utils.config import settings
+
+_WORD = re.compile(r"\w+")
+
+# Relative weight of a match by field, as ts_rank weighs the A/B/D labels
+# of the PostgreSQL search documents
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+MESSAGE_WEIGHT = 0.1
+
+
+class TicketSearch(ABC):
+    """
+    Ranks tickets by how well their title, description and messages match
+    a query. `user_id` restricts the results to one user's tickets.
+    """
+
+    @abstractmethod
+    async def search(self, db: AsyncSession, query: str, user_id: Optional[UUID], limit: int) -> List[Ticket]:
+        """Matching tickets, best first."""
+
+    async def warm_up(self, db: AsyncSession) -> None:
+        """Load what the first search would otherwise have to."""
+
+    def add_ticket(self, ticket_id: UUID, user_id: UUID, title: Optional[str], description: Optional[str]) -> None:
+        """Index a new ticket; backends whose index the database maintains ignore this."""
+
+    def add_message(self, ticket_id: UUID, content: Optional[str]) -> None:
+        """Index a new message; backends whose index the database maintains ignore this."""
+
+    def remove_message(self, ticket_id: UUID, content: Optional[str]) -> None:
+        """Unindex a message moved out of the messages table, e.g. archived."""
+
+
+class PostgresTicketSearch(TicketSearch):
+    """
+    Full-text search over the GIN expression indexes on tickets and
+    messages, which PostgreSQL keeps up to date on every insert.
+    """
+
+    async def search(self, db: AsyncSession, query: str, user_id: Optional[UUID], limit: int) -> List[Ticket]:
+        tsquery = func.websearch_to_tsquery(literal_column("'english'"), query)
+        ticket_document = literal_column(TICKET_SEARCH_DOCUMENT)
+        message_document = literal_column(MESSAGE_SEARCH_DOCUMENT)
+
+        ticket_hits = select(Ticket.id.label("ticket_id"), func.ts_rank(ticket_document, tsquery).label("rank")).filter(
+            ticket_document.op("@@")(tsquery)
+        )
+        message_hits = (
+            select(Message.ticket_id, func.max(func.ts_rank(message_document, tsquery)).label("rank"))
+            .filter(message_document.op("@@")(tsquery))
+            .group_by(Message.ticket_id)
+        )
+        if user_id is not None:
+            ticket_hits = ticket_hits.filter(Ticket.user_id == user_id)
+            message_hits = message_hits.join(Ticket, Ticket.id == Message.ticket_id).filter(Ticket.user_id == user_id)
+
+        hits = union_all(ticket_hits, message_hits).subquery()
+        scores = select(hits.c.ticket_id, func.sum(hits.c.rank).label("score")).group_by(hits.c.ticket_id).subquery()
+        statement = (
+            select(Ticket)
+            .join(scores, scores.c.ticket_id == Ticket.id)
+            .order_by(scores.c.score.desc(), Ticket.created_at.desc())
+            .limit(limit)
+        )
+        return list(await db.scalars(statement))
+
+
+class InMemoryTicketSearch(TicketSearch):
+    """
+    Inverted index kept in this process, for SQLite and tests. It is built
+    from the database on first use and then updated as inserts of tickets
+    and messages are committed, and as messages are archived; changes made
+    by other processes are not seen.
+
+    All query words must match (as with websearch_to_tsquery); there is no
+    stemming or phrase search.
+    """
+
+    def __init__(self):
+        # word -> ticket id -> weighted number of occurrences
+        self._postings: Dict[str, Dict[UUID, float]] = defaultdict(dict)
+        self._owners: Dict[UUID, UUID] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _words(text: Optional[str]) -> List[str]:
+        return _WORD.findall((text or "").lower())
+
+    def _add(self, ticket_id: UUID, text: Optional[str], weight: float) -> None:
+        for word in self._words(text):
+            postings = self._postings[word]
+            postings[ticket_id] = postings.get(ticket_id, 0.0) + weight
+
+    def _add_ticket(self, ticket_id: UUID, user_id: UUID, title: Optional[str], description: Optional[str]) -> None:
+        self._owners[ticket_id] = user_id
+        self._add(ticket_id, title, TITLE_WEIGHT)
+        self._add(ticket_id, description, DESCRIPTION_WEIGHT)
+
+    def add_ticket(self, ticket_id: UUID, user_id: UUID, title: Optional[str], description: Optional[str]) -> None:
+        if self._loaded:
+            self._add_ticket(ticket_id, user_id, title, description)
+
+    def add_message(self, ticket_id: UUID, content: Optional[str]) -> None:
+        if self._loaded:
+            self._add(ticket_id, content, MESSAGE_WEIGHT)
+
+    def remove_message(self, ticket_id: UUID, content: Optional[str]) -> None:
+        if not self._loaded:
+            return
+        for word in self._words(content):
+            postings = self._postings.get(word)
+            if postings is None or ticket_id not in postings:
+                continue
+            remaining = postings[ticket_id] - MESSAGE_WEIGHT
+            # Weights are summed as floats, so what is left may not be exactly 0
+            if remaining > 1e-9:
+                postings[ticket_id] = remaining
+            else:
+                del postings[ticket_id]
+                if not postings:
+                    del self._postings[word]
+
+    async def _load(self, db: AsyncSession) -> None:
+        async with self._lock:
+            if self._loaded:
+                return
+            try:
+                for row in await db.execute(select(Ticket.id, Ticket.user_id, Ticket.title, Ticket.description)):
+                    self._add_ticket(row.id, row.user_id, row.title, row.description)
+                for row in await db.execute(select(Message.ticket_id, Message.content)):
+                    self._add(row.ticket_id, row.content, MESSAGE_WEIGHT)
+            except Exception:
+                # Start over on the next search rather than keep a partial index
+                self._postings.clear()
+                self._owners.clear()
+                raise
+            self._loaded = True
+
+    async def warm_up(self, db: AsyncSession) -> None:
+        await self._load(db)
+
+    async def search(self, db: AsyncSession, query: str, user_id: Optional[UUID], limit: int) -> List[Ticket]:
+        await self._load(db)
+        words = set(self._words(query))
+        if not words:
+            return []
+
+        # Rarest words first, so the candidate set shrinks fastest
+        postings = sorted((self._postings.get(word, {}) for word in words), key=len)
+        candidates: Set[UUID] = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting.keys()
+        if user_id is not None:
+            candidates = {ticket_id for ticket_id in candidates if self._owners.get(ticket_id) == user_id}
+
+        # Dampened term frequency, so a long conversation repeating one word
+        # does not outrank a matching title
+        scores = {
+            ticket_id: sum(math.log1p(posting[ticket_id]) for posting in postings)
+            for ticket_id in candidates
+        }
+        best = sorted(scores, key=scores.get, reverse=True)[:limit]
+        if not best:
+            return []
+        tickets = {ticket.id: ticket for ticket in await db.scalars(select(Ticket).filter(Ticket.id.in_(best)))}
+        return [tickets[ticket_id] for ticket_id in best if ticket_id in tickets]
+
+
+def create_ticket_search() -> TicketSearch:
+    backend = settings.SEARCH_BACKEND
+    if backend == "auto":
+        backend = "postgres" if engine.dialect.name == "postgresql" else "memory"
+    if backend == "postgres":
+        return PostgresTicketSearch()
+    if backend == "memory":
+        return InMemoryTicketSearch()
+    raise ValueError(f"Unknown SEARCH_BACKEND: {settings.SEARCH_BACKEND}")
+
+
+ticket_search = create_ticket_search()
+
+
+# Tickets and messages inserted by a session are indexed once its
+# transaction commits, so rolled back inserts are never searchable
+_PENDING_INDEX = "ticket_search_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_inserts(session: Session, flush_context) -> None:
+    pending = session.info.setdefault(_PENDING_INDEX, [])
+    for target in session.new:
+        if isinstance(target, Ticket):
+            pending.append((ticket_search.add_ticket, (target.id, target.user_id, target.title, target.description)))
+        elif isinstance(target, Message):
+            pending.append((ticket_search.add_message, (target.ticket_id, target.content)))
+
+
+@event.listens_for(Session, "after_commit")
+def _index_inserts(session: Session) -> None:
+    for add, args in session.info.pop(_PENDING_INDEX, ()):
+        add(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_inserts(session: Session) -> None:
+    session.info.pop(_PENDING_INDEX, None)
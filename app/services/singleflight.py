@@ -0,0 +1,98 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # Avoid "exception was never retrieved" when every caller has gone away
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight(Generic[T]):
+    """
+    Runs at most one call per key at a time; concurrent callers with the same
+    key wait for and share the result (or exception) of the call in flight.
+
+    The shared call runs in its own task, so a caller that is cancelled does
+    not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+            future.add_done_callback(_consume_exception)
+        return await asyncio.shield(future)
+
+
+class _Broadcast:
+    """
+    Pumps one async iterator into a buffer that any number of subscribers
+    replay from the start and then follow live.
+    """
+
+    def __init__(self, source: AsyncIterator[str]):
+        self._chunks: List[str] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Condition()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                async with self._changed:
+                    self._chunks.append(chunk)
+                    self._changed.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            async with self._changed:
+                self._done = True
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self._chunks) or self._done)
+                chunks = self._chunks[position:]
+                done = self._done
+            for chunk in chunks:
+                yield chunk
+            position += len(chunks)
+            if done and position == len(self._chunks):
+                if self._error is not None:
+                    raise self._error
+                return
+
+
+class StreamGroup:
+    """
+    Single-flight for streams: concurrent subscribers with the same key share
+    one upstream stream, each receiving every chunk from the first one on.
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, _Broadcast] = {}
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def subscribe(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast(open_stream())
+            self._streams[key] = broadcast
+            broadcast.task.add_done_callback(lambda _: self._streams.pop(key, None))
+        return broadcast.subscribe()
@@ -0,0 +1,113 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.ticket import Ticket
+from app.schemas.ticket import TicketOut, TICKET_ADAPTER
+from app.utils.cache import TTLCache, CacheBackend
+from app.utils.config import settings
+
+
+@dataclass
+class CachedTicket:
+    ticket: TicketOut
+    # TicketOut serialized as JSON, and the strong ETag derived from it
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "CachedTicket":
+        return cls(TICKET_ADAPTER.validate_json(body), body, _etag(body))
+
+    @classmethod
+    def from_ticket(cls, ticket: TicketOut) -> "CachedTicket":
+        return cls.from_body(TICKET_ADAPTER.dump_json(ticket))
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class TicketCache:
+    """
+    Caches tickets by id, both as `TicketOut` for ownership checks and
+    prompts and as serialized JSON with its ETag, so reading a ticket
+    usually needs neither a query nor serialization.
+
+    As with UserCache, a shared CacheBackend can be attached so that
+    invalidations made by one worker reach the others.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, shared: Optional[CacheBackend] = None):
+        self.ttl = ttl
+        self.cache = TTLCache(maxsize, ttl)
+        self.shared = shared
+
+    @staticmethod
+    def _shared_key(ticket_id: UUID) -> str:
+        return f"ticket:{ticket_id}"
+
+    async def get(self, ticket_id: UUID) -> Optional[CachedTicket]:
+        entry = self.cache.get(ticket_id)
+        if entry is not None or self.shared is None:
+            return entry
+
+        cached = await self.shared.get(self._shared_key(ticket_id))
+        if cached is None:
+            return None
+        entry = CachedTicket.from_body(cached.encode())
+        self.cache.set(ticket_id, entry)
+        return entry
+
+    async def set(self, ticket: Ticket) -> CachedTicket:
+        entry = CachedTicket.from_ticket(TICKET_ADAPTER.validate_python(ticket, from_attributes=True))
+        self.cache.set(entry.ticket.id, entry)
+        if self.shared is not None:
+            await self.shared.set(self._shared_key(entry.ticket.id), entry.body.decode(), self.ttl)
+        return entry
+
+    async def get_owned(self, db: AsyncSession, ticket_id: UUID, user_id: UUID) -> Optional[CachedTicket]:
+        """
+        The ticket if it exists and belongs to `user_id`, loading it into
+        the cache on a miss.
+        """
+        entry = await self.get(ticket_id)
+        if entry is None:
+            ticket = await db.scalar(select(Ticket).filter(Ticket.id == ticket_id))
+            if ticket is None:
+                return None
+            entry = await self.set(ticket)
+        return entry if entry.ticket.user_id == user_id else None
+
+    async def invalidate(self, ticket_id: UUID) -> None:
+        """
+        Drop a ticket from the local and shared caches; call whenever a
+        ticket row changes or a message is added to it.
+        """
+        self.cache.delete(ticket_id)
+        if self.shared is not None:
+            await self.shared.delete(self._shared_key(ticket_id))
+
+    def invalidate_local(self, ticket_id: UUID) -> None:
+        self.cache.delete(ticket_id)
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+
+ticket_cache = TicketCache(
+    maxsize=settings.TICKET_CACHE_MAX_SIZE,
+    ttl=settings.TICKET_CACHE_TTL_SECONDS,
+)
+
+
+@event.listens_for(Ticket, "after_update")
+@event.listens_for(Ticket, "after_delete")
+def _evict_changed_ticket(mapper, connection, target: Ticket) -> None:
+    # ORM events are synchronous, so only the local entry can be dropped here;
+    # bulk UPDATE statements bypass them, so writers also await ticket_cache.invalidate()
+    ticket_cache.invalidate_local(target.id)
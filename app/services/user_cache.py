@@ -0,0 +1,99 @@
+import hashlib
+import time
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import event
+
+from app.db.models.user import User
+from app.schemas.auth import CurrentUser
+from app.utils.cache import TTLCache, CacheBackend
+from app.utils.config import settings
+
+
+class UserCache:
+    """
+    Caches authenticated user principals by id, and decoded JWT payloads by
+    token hash until the token expires, so authenticated requests usually
+    need neither a users query nor a signature check.
+
+    A shared CacheBackend can be attached so that invalidations made by one
+    worker are seen by the others once their short local TTL lapses.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        token_maxsize: int,
+        shared: Optional[CacheBackend] = None,
+    ):
+        self.ttl = ttl
+        self._users = TTLCache(maxsize, ttl)
+        self._tokens = TTLCache(token_maxsize, ttl)
+        self.shared = shared
+
+    @property
+    def caches(self) -> Dict[str, TTLCache]:
+        """The local caches by name, for monitoring."""
+        return {"user": self._users, "token": self._tokens}
+
+    @staticmethod
+    def _shared_key(user_id: UUID) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    async def get(self, user_id: UUID) -> Optional[CurrentUser]:
+        user = self._users.get(user_id)
+        if user is not None or self.shared is None:
+            return user
+
+        cached = await self.shared.get(self._shared_key(user_id))
+        if cached is None:
+            return None
+        user = CurrentUser.model_validate_json(cached)
+        self._users.set(user_id, user)
+        return user
+
+    async def set(self, user: CurrentUser) -> None:
+        self._users.set(user.id, user)
+        if self.shared is not None:
+            await self.shared.set(self._shared_key(user.id), user.model_dump_json(), self.ttl)
+
+    async def invalidate(self, user_id: UUID) -> None:
+        """
+        Drop a user from the local and shared caches; call whenever a user row changes.
+        """
+        self._users.delete(user_id)
+        if self.shared is not None:
+            await self.shared.delete(self._shared_key(user_id))
+
+    def invalidate_local(self, user_id: UUID) -> None:
+        self._users.delete(user_id)
+
+    def get_token_payload(self, token: str) -> Optional[dict]:
+        return self._tokens.get(self._token_key(token))
+
+    def set_token_payload(self, token: str, payload: dict) -> None:
+        # Never keep a payload past the token's own expiry
+        remaining = payload.get("exp", 0) - time.time()
+        if remaining > 0:
+            self._tokens.set(self._token_key(token), payload, min(remaining, self.ttl))
+
+
+user_cache = UserCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    token_maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_changed_user(mapper, connection, target: User) -> None:
+    # ORM events are synchronous, so only the local entry can be dropped here;
+    # code changing users should also await user_cache.invalidate()
+    user_cache.invalidate_local(target.id)
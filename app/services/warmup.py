@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.db.models.ticket import Ticket, TICKET_OPEN, TICKET_IN_PROGRESS
+from app.db.session import engine, SessionLocal
+from app.services.groq import llm_router
+from app.services.password_hasher import password_hasher
+from app.services.search import ticket_search
+from app.services.ticket_cache import ticket_cache
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """
+    Startup state of this worker process, as reported by /readyz: ready once
+    warm-up is over, and no longer once shutdown has begun.
+    """
+
+    def __init__(self):
+        self.warmed_up = False
+        self.draining = False
+        # Seconds taken by each startup phase ("import", "warmup")
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed_up and not self.draining
+
+
+readiness = Readiness()
+
+
+async def prewarm_pool(connections: int) -> int:
+    """
+    Open up to `connections` pool connections at once and return them to
+    the pool idle. Returns how many were opened.
+    """
+    pool = engine.sync_engine.pool
+    # NullPool (PgBouncer mode) keeps no connections to warm
+    if not hasattr(pool, "size"):
+        return 0
+    # Connections beyond pool_size are overflow, closed as soon as they are returned
+    count = min(connections, pool.size())
+    results = await asyncio.gather(*(engine.connect().start() for _ in range(count)), return_exceptions=True)
+    opened = [result for result in results if not isinstance(result, BaseException)]
+    await asyncio.gather(*(connection.close() for connection in opened))
+    if len(opened) < count:
+        raise next(result for result in results if isinstance(result, BaseException))
+    return count
+
+
+async def warm_caches(tickets: int) -> None:
+    """
+    Build the in-process search index and load the tickets most likely to
+    be read next (recent, not yet resolved) into the ticket cache.
+    """
+    async with SessionLocal() as db:
+        await ticket_search.warm_up(db)
+        if tickets > 0:
+            recent = await db.scalars(
+                select(Ticket)
+                .filter(Ticket.status.in_((TICKET_OPEN, TICKET_IN_PROGRESS)))
+                .order_by(Ticket.created_at.desc())
+                .limit(tickets)
+            )
+            for ticket in recent:
+                await ticket_cache.set(ticket)
+
+
+async def _timed(name: str, step) -> Tuple[str, Optional[Exception], float]:
+    started = time.perf_counter()
+    try:
+        await step
+    except Exception as e:
+        return name, e, time.perf_counter() - started
+    return name, None, time.perf_counter() - started
+
+
+async def warm_up() -> None:
+    """
+    Run every warm-up step concurrently, within STARTUP_WARMUP_TIMEOUT, then
+    mark the worker ready. A failed or slow step only costs the first
+    requests the latency warm-up would have saved them; whether the
+    database is reachable is checked by /readyz itself.
+    """
+    started = time.perf_counter()
+    steps = [
+        _timed("database pool", prewarm_pool(settings.DB_POOL_PREWARM)),
+        _timed("password hasher", password_hasher.warm_up()),
+        _timed("caches", warm_caches(settings.STARTUP_WARM_TICKETS)),
+    ]
+    if settings.STARTUP_WARM_LLM:
+        steps.append(_timed("LLM providers", llm_router.warm_up()))
+
+    try:
+        results = await asyncio.wait_for(asyncio.gather(*steps), settings.STARTUP_WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"Warm-up did not finish within {settings.STARTUP_WARMUP_TIMEOUT}s, serving anyway")
+    else:
+        for name, error, seconds in results:
+            if error is not None:
+                logger.warning(f"Warm-up of the {name} failed after {seconds:.3f}s: {error}")
+
+    readiness.timings["warmup"] = time.perf_counter() - started
+    readiness.warmed_up = True
+    logger.info(f"Warm-up finished in {readiness.timings['warmup']:.3f}s")
+
+
+async def database_reachable(timeout: float) -> bool:
+    """Whether a pooled connection answers a trivial query within `timeout` seconds."""
+
+    async def ping() -> None:
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+
+    try:
+        await asyncio.wait_for(ping(), timeout)
+    except Exception as e:
+        logger.warning(f"Readiness database check failed: {e!r}")
+        return False
+    return True
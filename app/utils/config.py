@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
+from typing import List
 import os
 
 load_dotenv()
@@ -7,6 +8,35 @@ load_dotenv()
 class Settings(BaseSettings):
     DATABASE_URL: str
 
+    # Log every SQL statement (development only, costly under load)
+    DB_ECHO: bool = False
+
+    # Connection pool per worker process: persistent connections, extra
+    # connections allowed under burst, and seconds to wait for a free one
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+
+    # Test connections on checkout, and replace them after this many seconds
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+
+    # Pool connections opened at startup so the first requests do not pay for
+    # connecting (capped at DB_POOL_SIZE; ignored with DB_PGBOUNCER)
+    DB_POOL_PREWARM: int = 5
+
+    # Server-side statement timeout in milliseconds (0 disables it)
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Connect through PgBouncer in transaction pooling mode: no client-side pool
+    # and no reuse of named prepared statements across transactions
+    DB_PGBOUNCER: bool = False
+
+    # lock_timeout of migration connections: DDL waiting longer than this for
+    # a lock on a busy table fails instead of stalling the queries queued
+    # behind it (0 waits forever)
+    DB_MIGRATION_LOCK_TIMEOUT_MS: int = 5000
+
     SECRET_KEY: str
 
     # Algorithm used to sign the JWT tokens (default: HS256)
@@ -15,9 +45,187 @@ class Settings(BaseSettings):
     # Token expiration time in minutes (default: 60) You can change it as per the requirement
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # Default and maximum number of items returned per page by list endpoints
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
+
+    # bcrypt cost factor for new hashes; existing hashes are upgraded on login
+    BCRYPT_ROUNDS: int = 12
+
+    # Processes dedicated to password hashing, and how many hash/verify calls
+    # may wait for them before signup/login answer 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # Seconds an authenticated user stays cached per worker, and how many users /
+    # decoded tokens are kept (0 disables the respective cache)
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Tickets cached per worker for ownership checks and GET /tickets/{id},
+    # and seconds an entry is kept (0 size disables the cache)
+    TICKET_CACHE_MAX_SIZE: int = 10000
+    TICKET_CACHE_TTL_SECONDS: float = 30.0
+
     # API key for accessing Groq AI services
     GROQ_API_KEY: str
 
+    # Chat completions endpoint and model used for AI replies
+    GROQ_API_URL: str = "https://api.groq.com/openai/v1/chat/completions"
+    GROQ_MODEL: str = "llama-3.3-70b-versatile"
+
+    # Seconds allowed to open a connection / wait between bytes of a response
+    GROQ_CONNECT_TIMEOUT: float = 5.0
+    GROQ_READ_TIMEOUT: float = 60.0
+
+    # Size of the shared keep-alive connection pool and whether to negotiate HTTP/2
+    GROQ_MAX_CONNECTIONS: int = 100
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    GROQ_HTTP2: bool = True
+
+    # Maximum number of completions in flight at once per worker
+    GROQ_MAX_CONCURRENCY: int = 200
+
+    # Retries on 429/5xx responses, with exponential backoff starting at this many seconds
+    GROQ_MAX_RETRIES: int = 3
+    GROQ_RETRY_BACKOFF: float = 0.5
+
+    # Providers for AI replies as a JSON list, ranked by observed latency and
+    # error rate. Each entry overrides the GROQ_* settings for one OpenAI-compatible
+    # endpoint, e.g. [{"name": "groq"}, {"name": "backup", "api_url": "...",
+    # "api_key": "...", "model": "..."}]; {"type": "mock", "latency": 0.2} adds an
+    # offline mock. When empty, Groq is the only provider.
+    LLM_PROVIDERS: List[dict] = []
+
+    # Seconds without a reply (or first token) after which a second provider
+    # is asked as well and the faster answer wins (0 disables hedging)
+    LLM_HEDGE_DELAY_SECONDS: float = 0.0
+
+    # Consecutive failures that take a provider out of rotation, and seconds
+    # before a single probe request is let through again
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Number of recent calls per provider used for latency percentiles and error rate
+    LLM_LATENCY_WINDOW: int = 100
+
+    # System prompt sent ahead of the ticket details and conversation
+    AI_SYSTEM_PROMPT: str = (
+        "You are a helpful customer support assistant. Answer the customer's latest "
+        "message using the ticket details and the conversation so far."
+    )
+
+    # Estimated prompt tokens allowed per AI request, and how many recent
+    # messages of a ticket are considered for it
+    AI_CONTEXT_TOKEN_BUDGET: int = 3000
+    AI_CONTEXT_HISTORY_LIMIT: int = 50
+
+    # Tickets whose tokenized history is cached per worker, and for how long
+    AI_CONTEXT_CACHE_SIZE: int = 1000
+    AI_CONTEXT_CACHE_TTL_SECONDS: float = 600.0
+
+    # Cache of AI answers to opening questions: size and seconds an answer is kept
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_SIZE: int = 5000
+    RESPONSE_CACHE_TTL_SECONDS: float = 86400.0
+
+    # Also answer questions similar to a cached one (cosine similarity of
+    # n-gram vectors, requires numpy) when the similarity reaches the threshold
+    RESPONSE_CACHE_SIMILARITY_ENABLED: bool = True
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD: float = 0.92
+
+    # Backend for background AI reply jobs: "memory" (asyncio workers in this
+    # process) or "database" (ai_jobs table polled with SKIP LOCKED)
+    AI_JOB_BACKEND: str = "memory"
+
+    # Number of workers per process and maximum jobs waiting in the in-memory queue
+    AI_JOB_WORKERS: int = 4
+    AI_JOB_QUEUE_SIZE: int = 1000
+
+    # Seconds between polls of an empty database queue, and after which a
+    # running database job whose worker stopped renewing its lease is
+    # considered abandoned and picked up again
+    AI_JOB_POLL_INTERVAL: float = 1.0
+    AI_JOB_LEASE_SECONDS: int = 300
+
+    # Attempts per database job before it is marked failed
+    AI_JOB_MAX_ATTEMPTS: int = 3
+
+    # Messages a user may post per minute on average, and the burst allowed
+    # on top of that (0 per minute disables rate limiting)
+    RATE_LIMIT_MESSAGES_PER_MINUTE: float = 20.0
+    RATE_LIMIT_MESSAGES_BURST: int = 10
+
+    # AI replies generated at once per worker for request-bound (sync and
+    # stream) callers, how many more may wait for a slot and for how many
+    # seconds before being turned away with 503
+    LLM_MAX_CONCURRENT_REQUESTS: int = 100
+    LLM_MAX_WAITING_REQUESTS: int = 200
+    LLM_ADMISSION_TIMEOUT: float = 5.0
+
+    # Seconds an agent's claim on a ticket lasts unless renewed, and the
+    # most tickets one claim request may take
+    AGENT_LEASE_SECONDS: int = 900
+    AGENT_CLAIM_MAX: int = 50
+
+    # Live events (GET /events): recent events kept per worker for clients
+    # resuming with Last-Event-ID, events queued per client before a slow
+    # client is disconnected, and seconds between heartbeats
+    EVENTS_REPLAY_SIZE: int = 1000
+    EVENTS_SUBSCRIBER_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+
+    # Share events between worker processes: "none" or "postgres" (LISTEN/NOTIFY on EVENTS_CHANNEL)
+    EVENTS_BRIDGE: str = "none"
+    EVENTS_CHANNEL: str = "support_events"
+
+    # Ticket search: "postgres" (full-text GIN indexes), "memory" (inverted
+    # index in each process, for SQLite and tests) or "auto" to pick by database
+    SEARCH_BACKEND: str = "auto"
+
+    # Rows inserted per statement and transaction by POST /import, whether
+    # to load them with COPY on PostgreSQL, and how many row errors are reported
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_USE_COPY: bool = True
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+
+    # Archival of old conversations: messages of resolved tickets older than
+    # this many days are moved, compressed, into message_archives every
+    # MESSAGE_ARCHIVE_INTERVAL_SECONDS and stay readable through the history
+    # API (0 disables archival)
+    MESSAGE_ARCHIVE_AFTER_DAYS: int = 0
+    MESSAGE_ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+    # Tickets archived per run, each in its own transaction
+    MESSAGE_ARCHIVE_BATCH_TICKETS: int = 500
+    # Encoding of archives: "parquet" (requires pyarrow), "json.gz" or
+    # "auto" for parquet when pyarrow is installed
+    MESSAGE_ARCHIVE_FORMAT: str = "auto"
+    # Decoded archives kept per worker for history reads
+    MESSAGE_ARCHIVE_CACHE_SIZE: int = 200
+
+    # Monthly partitions of messages created ahead of time, checked every
+    # MESSAGE_ARCHIVE_INTERVAL_SECONDS when the table is partitioned
+    # (PostgreSQL, see python -m app.db.partitions)
+    MESSAGE_PARTITIONS_AHEAD: int = 3
+
+    # Startup warm-up (pool connections, LLM connections, password hashing
+    # processes, caches) runs in the background once the app accepts
+    # connections; /readyz reports ready when it finished or timed out
+    STARTUP_WARMUP_TIMEOUT: float = 5.0
+    STARTUP_WARM_LLM: bool = True
+    # Most recent open and in-progress tickets loaded into the ticket cache
+    STARTUP_WARM_TICKETS: int = 500
+
+    # Seconds the /readyz database check may take before reporting not ready
+    READINESS_DB_TIMEOUT: float = 1.0
+
+    # Importing the app taking longer than this is logged as a warning
+    IMPORT_TIME_BUDGET_SECONDS: float = 2.0
+
+    # Collect request, database, LLM and cache metrics and serve them at GET /metrics
+    METRICS_ENABLED: bool = True
+
     # Configuration to load variables from a .env file
     class Config:
         env_file = ".env"
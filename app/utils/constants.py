@@ -5,9 +5,38 @@ EMAIL_PASSWORD_REQUIRED = "Email and password are required"
 USER_NOT_FOUND = "User not found"
 INVALID_PASSWORD = "Invalid password"
 LOGIN_SUCCESS = "Login successful"
+SERVER_BUSY = "Server is busy, please retry shortly"
 
 # Tickets
 TICKET_CREATED_SUCCESSFULLY = "Ticket created successfully"
 TICKETS_RETRIEVED_SUCCESSFULLY = "Tickets retrieved successfully"
 TICKET_RETRIEVED_SUCCESSFULLY = "Ticket retrieved successfully"
-TICKET_NOT_FOUND = "Ticket not found"
\ No newline at end of file
+TICKET_NOT_FOUND = "Ticket not found"
+INVALID_CURSOR = "Invalid pagination cursor"
+SEARCH_RESULTS_RETRIEVED = "Search results retrieved successfully"
+
+# Agent work queue
+TICKETS_CLAIMED = "Tickets claimed"
+LEASE_RENEWED = "Lease renewed"
+TICKET_RELEASED = "Ticket released"
+TICKET_RESOLVED = "Ticket resolved"
+LEASE_NOT_HELD = "Ticket is not leased to you"
+
+# Messages
+MESSAGES_RETRIEVED_SUCCESSFULLY = "Messages retrieved successfully"
+MESSAGE_CREATED_AI_STREAM_PENDING = "Message created, AI response will be streamed"
+MESSAGE_CREATED_AI_QUEUED = "Message created, AI response queued"
+AI_QUEUE_FULL = "AI response queue is full, please retry shortly"
+RATE_LIMITED = "Too many messages, please slow down"
+AI_BUSY = "AI assistant is busy, please retry shortly"
+AI_UNAVAILABLE = "AI assistant is unavailable, please retry shortly"
+AI_REPLY_QUEUED = "AI response is being generated in the background and will arrive as a new message"
+AI_REPLY_IN_PROGRESS = "AI response is already being generated for this ticket"
+
+# Import
+IMPORT_COMPLETED = "Import completed"
+
+# Health
+ALIVE = "Alive"
+READY = "Ready"
+NOT_READY = "Not ready"
@@ -1,17 +1,21 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
 from app.db.session import get_db
-from app.db.models.user import User
+from app.db.models.user import User, AGENT_ROLE
+from app.schemas.auth import CurrentUser
+from app.services.user_cache import user_cache
 from app.utils.security import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CurrentUser:
     """
-    Validates the JWT access token, retrieves the corresponding user from the database,
-    and returns the authenticated user object.
+    Validates the JWT access token, retrieves the corresponding user from the user cache
+    or the database, and returns the authenticated user principal.
     """
     # Define a standard unauthorized error to be raised if validation fails
     credentials_exception = HTTPException(
@@ -20,17 +24,40 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # Decode the JWT token to extract payload
-    payload = decode_access_token(token)
+    # Decode the JWT token to extract payload, reusing a previous decode of the same token
+    payload = user_cache.get_token_payload(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        if payload:
+            user_cache.set_token_payload(token, payload)
 
     # If payload is invalid or 'sub' (subject i.e. user ID) is missing, raise exception
     if not payload or "sub" not in payload:
         raise credentials_exception
 
+    try:
+        user_id = UUID(payload["sub"])
+    except (TypeError, ValueError):
+        raise credentials_exception
+
+    user = await user_cache.get(user_id)
+    if user:
+        return user
+
     # Fetch the user from the database using the ID from token's payload
-    user = db.query(User).filter(User.id == payload["sub"]).first()
+    db_user = await db.scalar(select(User).filter(User.id == user_id))
 
-    if not user:
+    if not db_user:
         raise credentials_exception
 
+    user = CurrentUser.model_validate(db_user)
+    await user_cache.set(user)
     return user
+
+async def require_agent(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    """
+    Like get_current_user, but only lets support agents through.
+    """
+    if current_user.role != AGENT_ROLE:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Agent access required")
+    return current_user
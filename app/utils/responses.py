@@ -0,0 +1,54 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional, Sequence
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+
+@lru_cache(maxsize=256)
+def _envelope_prefix(status_code: int, message: str) -> bytes:
+    # Everything before the data is the same for every response with this
+    # status and message, so it is serialized once
+    return (
+        b'{"success":' + (b"true" if status_code < 400 else b"false")
+        + b',"status_code":' + str(status_code).encode()
+        + b',"message":' + to_json(message)
+        + b',"data":'
+    )
+
+
+def envelope(
+    status_code: int,
+    message: str,
+    data: Any = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """
+    Build the standard `{"success", "status_code", "message", "data"}` JSON
+    response. `data` is serialized by pydantic-core, so UUIDs, datetimes and
+    models need no prior conversion; bytes are taken as already encoded JSON
+    (see dump_models / dump_page).
+    """
+    body = data if isinstance(data, bytes) else to_json(data)
+    return Response(
+        content=_envelope_prefix(status_code, message) + body + b"}",
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def dump_models(adapter: TypeAdapter, value: Any) -> bytes:
+    """
+    Validate ORM objects (or a list of them) straight from their attributes
+    and serialize the result to JSON bytes, both inside pydantic-core.
+    """
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def dump_page(adapter: TypeAdapter, items: Sequence[Any], next_cursor: Optional[str]) -> bytes:
+    """
+    JSON for a page of `items`, validated with a list `adapter`.
+    """
+    return b'{"items":' + dump_models(adapter, items) + b',"next_cursor":' + to_json(next_cursor) + b"}"
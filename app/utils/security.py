@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from jose import jwt, JWTError
-from passlib.context import CryptContext
-from typing import Optional
+from typing import Optional, Tuple
 import os
 from dotenv import load_dotenv
 from app.utils.config import settings
@@ -13,8 +13,16 @@ SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def password_context():
+    """
+    The password hashing context; hashes made with a different number of rounds
+    are reported as needing an update so they can be rehashed on login.
+    """
+    # Imported on first use: hashing runs in the password hasher's pool
+    # processes, so API workers need not import passlib at startup
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -24,10 +32,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and return a replacement hash when the stored one is outdated.
+    """
+    return password_context().verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 def decode_access_token(token: str):
     try:
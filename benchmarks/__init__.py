@@ -0,0 +1,7 @@
+"""
+Load tests and benchmarks for the API; see benchmarks/README.md.
+"""
+
+# Credentials of the users created by benchmarks.seed
+BENCH_PASSWORD = "bench-password"
+BENCH_EMAIL = "bench{}@example.com"
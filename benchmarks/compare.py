@@ -0,0 +1,60 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 when a scenario's p95 latency grew, or its throughput
+dropped, by more than the threshold percentage.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional, Tuple
+
+
+def _load(path: str) -> Dict[Tuple[str, int], dict]:
+    with open(path) as f:
+        report = json.load(f)
+    return {(result["scenario"], result["concurrency"]): result for result in report["results"]}
+
+
+def _change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def _format(change: Optional[float]) -> str:
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    baseline, candidate = _load(args.baseline), _load(args.candidate)
+    regressions = 0
+    print(f"{'scenario':16} {'conc':>5} {'rps':>10} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key], candidate[key]
+        rps = _change(before["throughput_rps"], after["throughput_rps"])
+        latency = {
+            q: _change(before["latency_ms"][q], after["latency_ms"][q]) for q in ("p50", "p95", "p99")
+        }
+        regressed = (latency["p95"] or 0) > args.threshold or (rps or 0) < -args.threshold
+        regressions += regressed
+        print(
+            f"{key[0]:16} {key[1]:>5} {_format(rps):>10} {_format(latency['p50']):>9} "
+            f"{_format(latency['p95']):>9} {_format(latency['p99']):>9}" + ("  REGRESSION" if regressed else "")
+        )
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{key[0]:16} {key[1]:>5}  only in {'baseline' if key in baseline else 'candidate'}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Check how long importing the app takes, which delays every new worker.
+
+    python -m benchmarks.import_time --budget 2.0 --top 15
+
+Imports app.main in fresh interpreters (with the environment of this
+shell, so DATABASE_URL and the other required settings must be set),
+reports the best of --runs wall-clock times and the slowest top-level
+imports from `python -X importtime`, and exits with status 1 when the
+best time is over the budget.
+"""
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+TIMED_IMPORT = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+
+def _import_seconds() -> float:
+    result = subprocess.run([sys.executable, "-c", TIMED_IMPORT], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _slowest_imports(top: int) -> List[Tuple[str, float]]:
+    """Cumulative seconds of the modules imported directly by app.main (or its package)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting shows as indentation: two spaces per level below app.main
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1 and cumulative.strip().isdigit():
+            modules.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=2.0, help="allowed import time in seconds")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    best = min(_import_seconds() for _ in range(max(args.runs, 1)))
+    print(f"{'module':48} {'seconds':>8}")
+    for name, seconds in _slowest_imports(args.top):
+        print(f"{name:48} {seconds:8.3f}")
+    print(f"\nimport app.main: {best:.3f}s (best of {args.runs}), budget {args.budget:.3f}s")
+    if best > args.budget:
+        print("OVER BUDGET")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+OpenAI-compatible chat completions server with configurable latency, used
+in place of Groq by the benchmarks.
+
+    python -m benchmarks.mock_groq --port 9100 --latency 0.3 --tokens-per-second 80
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+REPLY_WORDS = (
+    "Thanks for reaching out. I have looked into your account and the issue you describe "
+    "is caused by a known problem that our team is already fixing. In the meantime please "
+    "clear your browser cache, sign out and sign in again, and let us know if it persists."
+).split()
+
+
+def create_app(latency: float, tokens_per_second: float, reply_tokens: int) -> Starlette:
+    words = [REPLY_WORDS[i % len(REPLY_WORDS)] for i in range(reply_tokens)]
+    token_delay = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+    async def completions(request: Request):
+        body = await request.json()
+        # Time to first token
+        await asyncio.sleep(latency)
+
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * len(words))
+            return JSONResponse({
+                "id": "mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                "usage": {"completion_tokens": len(words)},
+            })
+
+        async def events():
+            for i, word in enumerate(words):
+                chunk = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(token_delay)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="streaming rate (0 = no delay)")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="words per reply")
+    args = parser.parse_args()
+    app = create_app(args.latency, args.tokens_per_second, args.reply_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+End-to-end API benchmark. Boots the mock Groq server and the app (unless
+--base-url points at a running one), seeds benchmark data, then runs each
+scenario at every concurrency level and writes throughput and latency
+percentiles to a JSON file.
+
+    python -m benchmarks.run --database-url postgresql://postgres@localhost/bench \\
+        --concurrency 1,8,32 --duration 10 --output results.json
+
+Compare two result files with `python -m benchmarks.compare`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks import BENCH_EMAIL, BENCH_PASSWORD
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: int
+    ttft: Optional[float] = None
+
+
+@dataclass
+class BenchUser:
+    headers: Dict[str, str]
+    ticket_ids: List[str]
+
+
+@dataclass
+class Context:
+    users: List[BenchUser]
+    seeded_users: int
+    rng: random.Random = field(default_factory=lambda: random.Random(42))
+
+    def user(self, worker: int) -> BenchUser:
+        return self.users[worker % len(self.users)]
+
+    def ticket(self, worker: int) -> Tuple[BenchUser, str]:
+        user = self.user(worker)
+        return user, self.rng.choice(user.ticket_ids)
+
+
+Scenario = Callable[[httpx.AsyncClient, Context, int], Awaitable[Sample]]
+
+
+async def _timed(request: Awaitable[httpx.Response]) -> Sample:
+    started = time.perf_counter()
+    response = await request
+    return Sample(time.perf_counter() - started, response.status_code)
+
+
+async def signup(client: httpx.AsyncClient, ctx: Context, worker: int) -> Sample:
+    email = BENCH_EMAIL.format(f"-signup-{uuid.uuid4().hex[:12]}")
+    return await _timed(client.post("/auth/signup", json={"email": email, "password": BENCH_PASSWORD}))
+
+
+async def login(client: httpx.AsyncClient, ctx: Context, worker: int) -> Sample:
+    email = BENCH_EMAIL.format(ctx.rng.randrange(ctx.seeded_users))
+    return await _timed(client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD}))
+
+
+async def ticket_create(client: httpx.AsyncClient, ctx: Context, worker: int) -> Sample:
+    body = {"title": "Benchmark ticket", "description": "Created by the benchmark harness"}
+    return await _timed(client.post("/tickets/", json=body, headers=ctx.user(worker).headers))
+
+
+async def ticket_list(client: httpx.AsyncClient, ctx: Context, worker: int) -> Sample:
+    return await _timed(client.get("/tickets/", params={"limit": 50}, headers=ctx.user(worker).headers))
+
+
+async def message_history(client: httpx.AsyncClient, ctx: Context, worker: int) -> Sample:
+    user, ticket_id = ctx.ticket(worker)
+    return await _timed(client.get(f"/tickets/{ticket_id}/messages", params={"limit": 50}, headers=user.headers))
+
+
+async def message_post(client: httpx.AsyncClient, ctx: Context, worker: int) -> Sample:
+    user, ticket_id = ctx.ticket(worker)
+    body = {"content": f"Follow-up question {uuid.uuid4().hex[:8]}: is there any update?"}
+    return await _timed(client.post(f"/tickets/{ticket_id}/messages", json=body, headers=user.headers))
+
+
+async def message_stream(client: httpx.AsyncClient, ctx: Context, worker: int) -> Sample:
+    """Post a message with ai_mode=stream, then read the SSE reply to the end."""
+    user, ticket_id = ctx.ticket(worker)
+    body = {"content": f"Streaming question {uuid.uuid4().hex[:8]}: what should I try next?"}
+    started = time.perf_counter()
+    response = await client.post(
+        f"/tickets/{ticket_id}/messages", params={"ai_mode": "stream"}, json=body, headers=user.headers
+    )
+    if response.status_code >= 400:
+        return Sample(time.perf_counter() - started, response.status_code)
+
+    ttft = None
+    async with client.stream("GET", f"/tickets/{ticket_id}/ai-response", headers=user.headers) as stream:
+        status = stream.status_code
+        async for line in stream.aiter_lines():
+            if ttft is None and line.startswith("event: token"):
+                ttft = time.perf_counter() - started
+            if line.startswith("event: error"):
+                status = 599
+            if line.startswith("event: done"):
+                break
+    return Sample(time.perf_counter() - started, status, ttft)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "signup": signup,
+    "login": login,
+    "ticket_create": ticket_create,
+    "ticket_list": ticket_list,
+    "message_history": message_history,
+    "message_post": message_post,
+    "message_stream": message_stream,
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(max(int(round(q * len(sorted_values) + 0.5)) - 1, 0), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(values)
+    to_ms = lambda value: round(value * 1000, 2) if value is not None else None  # noqa: E731
+    return {
+        "p50": to_ms(percentile(values, 0.50)),
+        "p95": to_ms(percentile(values, 0.95)),
+        "p99": to_ms(percentile(values, 0.99)),
+        "mean": to_ms(sum(values) / len(values)) if values else None,
+        "max": to_ms(values[-1]) if values else None,
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient, ctx: Context, name: str, concurrency: int, duration: float, warmup: float
+) -> dict:
+    scenario = SCENARIOS[name]
+    samples: List[Sample] = []
+    errors: Dict[str, int] = {}
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def worker(worker_id: int) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                sample = await scenario(client, ctx, worker_id)
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            if started >= measure_from:
+                samples.append(sample)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample.status)] = statuses.get(str(sample.status), 0) + 1
+    ok = [sample for sample in samples if sample.status < 400]
+    result = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok) + sum(errors.values()),
+        "throughput_rps": round(len(ok) / duration, 2),
+        "status_codes": statuses,
+        "transport_errors": errors,
+        "latency_ms": summarize([sample.latency for sample in ok]),
+    }
+    ttfts = [sample.ttft for sample in ok if sample.ttft is not None]
+    if ttfts:
+        result["ttft_ms"] = summarize(ttfts)
+    return result
+
+
+async def prepare_users(client: httpx.AsyncClient, count: int) -> List[BenchUser]:
+    """Log in `count` seeded users and collect the ids of their tickets."""
+    semaphore = asyncio.Semaphore(4)
+
+    async def prepare(i: int) -> BenchUser:
+        async with semaphore:
+            response = await client.post(
+                "/auth/login", json={"email": BENCH_EMAIL.format(i), "password": BENCH_PASSWORD}
+            )
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+            tickets = await client.get("/tickets/", params={"limit": 50}, headers=headers)
+            tickets.raise_for_status()
+            return BenchUser(headers, [ticket["id"] for ticket in tickets.json()["data"]["items"]])
+
+    return list(await asyncio.gather(*(prepare(i) for i in range(count))))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, process: subprocess.Popen, timeout: float = 60.0, success: bool = False) -> None:
+    """Wait until `url` answers at all, or with a 2xx status when `success` is set."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+        try:
+            response = httpx.get(url, timeout=1.0)
+            if not success or response.is_success:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _app_env(args, mock_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=args.database_url,
+        SECRET_KEY=env.get("SECRET_KEY", "benchmark-secret"),
+        GROQ_API_KEY="benchmark",
+        GROQ_API_URL=f"{mock_url}/v1/chat/completions",
+        LLM_PROVIDERS="[]",
+        # Per-user limits would measure the limiter rather than the service
+        RATE_LIMIT_MESSAGES_PER_MINUTE="0",
+    )
+    return env
+
+
+async def benchmark(args, base_url: str) -> List[dict]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=max(args.concurrency))
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        users = await prepare_users(client, min(args.users, max(args.concurrency)))
+        ctx = Context(users=users, seeded_users=args.users)
+        results = []
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_level(client, ctx, name, concurrency, args.duration, args.warmup)
+                latency = result["latency_ms"]
+                print(
+                    f"{name:16} c={concurrency:<4} {result['throughput_rps']:>9.1f} req/s  "
+                    f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms  "
+                    f"errors={result['errors']}",
+                    flush=True,
+                )
+                results.append(result)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--base-url", help="benchmark an already running app instead of booting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), type=lambda value: value.split(","))
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda value: [int(v) for v in value.split(",")])
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each level")
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tickets-per-user", type=int, default=20)
+    parser.add_argument("--messages-per-ticket", type=int, default=10)
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data of an earlier run")
+    parser.add_argument("--mock-latency", type=float, default=0.3, help="mock LLM seconds to first token")
+    parser.add_argument("--mock-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--mock-reply-tokens", type=int, default=60)
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    processes: List[subprocess.Popen] = []
+    try:
+        base_url = args.base_url
+        if base_url is None:
+            mock_port, app_port = _free_port(), _free_port()
+            mock_url = f"http://127.0.0.1:{mock_port}"
+            processes.append(subprocess.Popen([
+                sys.executable, "-m", "benchmarks.mock_groq", "--port", str(mock_port),
+                "--latency", str(args.mock_latency),
+                "--tokens-per-second", str(args.mock_tokens_per_second),
+                "--reply-tokens", str(args.mock_reply_tokens),
+            ]))
+            env = _app_env(args, mock_url)
+            if not args.no_seed:
+                subprocess.run([
+                    sys.executable, "-m", "benchmarks.seed", "--reset", "--users", str(args.users),
+                    "--tickets-per-user", str(args.tickets_per_user),
+                    "--messages-per-ticket", str(args.messages_per_ticket),
+                ], env=env, check=True)
+            base_url = f"http://127.0.0.1:{app_port}"
+            processes.append(subprocess.Popen([
+                sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port),
+                "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+            ], env=env))
+            _wait_for(f"{mock_url}/", processes[0])
+            # Measure warmed-up workers only, as a load balancer would route to them
+            _wait_for(f"{base_url}/readyz", processes[1], success=True)
+
+        results = asyncio.run(benchmark(args, base_url))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": args.database_url.split("://", 1)[0] if not args.base_url else None,
+            "base_url": args.base_url,
+            "workers": args.workers,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "users": args.users,
+            "tickets_per_user": args.tickets_per_user,
+            "messages_per_ticket": args.messages_per_ticket,
+            "mock_latency_s": args.mock_latency,
+            "mock_tokens_per_second": args.mock_tokens_per_second,
+            "mock_reply_tokens": args.mock_reply_tokens,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Seed the configured database (DATABASE_URL) with benchmark users, tickets
+and messages. Users are bench{i}@example.com with password BENCH_PASSWORD.
+
+    python -m benchmarks.seed --users 200 --tickets-per-user 20 --messages-per-ticket 10
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from app.db.init_db import create_tables
+from app.db.models.ai_job import AIJob
+from app.db.models.message import Message
+from app.db.models.message_archive import MessageArchive
+from app.db.models.ticket import Ticket, TICKET_OPEN, TICKET_IN_PROGRESS, TICKET_RESOLVED
+from app.db.models.user import User
+from app.db.session import SessionLocal, engine
+from app.utils.security import get_password_hash
+from benchmarks import BENCH_EMAIL, BENCH_PASSWORD
+
+STATUSES = [TICKET_OPEN, TICKET_OPEN, TICKET_OPEN, TICKET_IN_PROGRESS, TICKET_RESOLVED]
+TOPICS = ["Login fails", "Refund request", "Invoice is wrong", "App crashes on start", "Cannot reset password"]
+BATCH_SIZE = 5000
+
+
+async def _insert_batches(db, table, rows) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        await db.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+async def seed(users: int, tickets_per_user: int, messages_per_ticket: int, seed_value: int) -> None:
+    random.seed(seed_value)
+    # One hash for every user: seeding should not spend minutes in bcrypt
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    emails = [BENCH_EMAIL.format(i) for i in range(users)]
+    now = datetime.utcnow()
+
+    async with SessionLocal() as db:
+        existing = set((await db.scalars(select(User.email).filter(User.email.in_(emails)))).all())
+        user_rows, ticket_rows, message_rows = [], [], []
+        for email in emails:
+            if email in existing:
+                continue
+            user_id = uuid.uuid4()
+            user_rows.append({"id": user_id, "email": email, "hashed_password": hashed_password, "role": "user"})
+            for _ in range(tickets_per_user):
+                ticket_id = uuid.uuid4()
+                created_at = now - timedelta(minutes=random.randint(60, 60 * 24 * 90))
+                topic = random.choice(TOPICS)
+                ticket_rows.append({
+                    "id": ticket_id,
+                    "title": topic,
+                    "description": f"{topic}: details provided by the customer.",
+                    "status": random.choice(STATUSES),
+                    "created_at": created_at,
+                    "user_id": user_id,
+                })
+                for m in range(messages_per_ticket):
+                    message_rows.append({
+                        "id": uuid.uuid4(),
+                        "content": f"Message {m} about {topic.lower()}. " * random.randint(1, 6),
+                        "is_ai": m % 2 == 1,
+                        "created_at": created_at + timedelta(minutes=m),
+                        "ticket_id": ticket_id,
+                    })
+
+        await _insert_batches(db, User, user_rows)
+        await _insert_batches(db, Ticket, ticket_rows)
+        await _insert_batches(db, Message, message_rows)
+        await db.commit()
+    print(f"Seeded {len(user_rows)} users, {len(ticket_rows)} tickets, {len(message_rows)} messages")
+
+
+async def reset() -> None:
+    """Delete everything created by benchmark users, including by earlier runs."""
+    async with SessionLocal() as db:
+        user_ids = select(User.id).filter(User.email.like(BENCH_EMAIL.format("%")))
+        ticket_ids = select(Ticket.id).filter(Ticket.user_id.in_(user_ids))
+        await db.execute(delete(AIJob).filter(AIJob.ticket_id.in_(ticket_ids)))
+        await db.execute(delete(Message).filter(Message.ticket_id.in_(ticket_ids)))
+        await db.execute(delete(MessageArchive).filter(MessageArchive.ticket_id.in_(ticket_ids)))
+        await db.execute(delete(Ticket).filter(Ticket.user_id.in_(user_ids)))
+        await db.execute(delete(User).filter(User.id.in_(user_ids)))
+        await db.commit()
+
+
+async def main(args) -> None:
+    await create_tables()
+    if args.reset:
+        await reset()
+    await seed(args.users, args.tickets_per_user, args.messages_per_ticket, args.seed)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tickets-per-user", type=int, default=20)
+    parser.add_argument("--messages-per-ticket", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42, help="random seed, for reproducible data")
+    parser.add_argument("--reset", action="store_true", help="delete earlier benchmark data first")
+    asyncio.run(main(parser.parse_args()))
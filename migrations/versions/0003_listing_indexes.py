@@ -0,0 +1,33 @@
+"""Indexes for paginated ticket lists and message history
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from app.db.migrations import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_online("ix_tickets_user_id_created_at_id", "tickets", ["user_id", "created_at", "id"])
+    create_index_online("ix_tickets_user_id_status", "tickets", ["user_id", "status"])
+    create_index_online("ix_messages_ticket_id_created_at_id", "messages", ["ticket_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_online("ix_messages_ticket_id_created_at_id", "messages")
+    drop_index_online("ix_tickets_user_id_status", "tickets")
+    drop_index_online("ix_tickets_user_id_created_at_id", "tickets")
@@ -0,0 +1,48 @@
+"""Ticket assignment and leases for the agent work queue
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.migrations import add_column, create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without defaults: catalog-only changes, no table rewrite. The
+    # constraint is named as PostgreSQL names those of create_all
+    add_column(
+        "tickets",
+        sa.Column(
+            "assigned_to",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", name="tickets_assigned_to_fkey"),
+            nullable=True,
+        ),
+    )
+    add_column("tickets", sa.Column("assigned_at", sa.DateTime(), nullable=True))
+    add_column("tickets", sa.Column("lease_expires_at", sa.DateTime(), nullable=True))
+    create_index_online("ix_tickets_status_created_at", "tickets", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_online("ix_tickets_status_created_at", "tickets")
+    with op.batch_alter_table("tickets") as batch:
+        batch.drop_column("lease_expires_at")
+        batch.drop_column("assigned_at")
+        batch.drop_column("assigned_to")
@@ -0,0 +1,44 @@
+"""Full-text search indexes on tickets and messages (PostgreSQL only)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import create_index_online, drop_index_online
+
+# The expressions of TICKET_SEARCH_DOCUMENT and MESSAGE_SEARCH_DOCUMENT at
+# this revision; queries only use the indexes while they match exactly
+TICKET_SEARCH_DOCUMENT = (
+    "(setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B'))"
+)
+MESSAGE_SEARCH_DOCUMENT = "to_tsvector('english', coalesce(content, ''))"
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    create_index_online("ix_tickets_search", "tickets", [sa.text(TICKET_SEARCH_DOCUMENT)], postgresql_using="gin")
+    create_index_online("ix_messages_search", "messages", [sa.text(MESSAGE_SEARCH_DOCUMENT)], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    drop_index_online("ix_messages_search", "messages")
+    drop_index_online("ix_tickets_search", "tickets")
@@ -0,0 +1,69 @@
+"""Archived messages, and messages ready for partitioning by created_at
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.migrations import backfill, drop_foreign_key, set_not_null
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # created_at becomes the partition key, which cannot be NULL; messages
+    # without one are dated like their ticket
+    backfill(
+        "messages",
+        "created_at = coalesce((SELECT tickets.created_at FROM tickets WHERE tickets.id = messages.ticket_id), "
+        "CURRENT_TIMESTAMP)",
+        "created_at IS NULL",
+    )
+    set_not_null("messages", "created_at")
+    # A partitioned messages table is unique on (id, created_at) only, and
+    # archived messages are no longer in it
+    drop_foreign_key("ai_jobs", "message_id")
+
+    op.create_table(
+        "message_archives",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("format", sa.String(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("first_created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_created_at", sa.DateTime(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("ticket_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tickets.id"), nullable=False),
+        if_not_exists=True,
+    )
+    # New and empty, so no need to build it concurrently
+    op.create_index(
+        "ix_message_archives_ticket_id_last_created_at",
+        "message_archives",
+        ["ticket_id", "last_created_at"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not op.get_context().as_sql and op.get_bind().scalar(sa.text("SELECT 1 FROM message_archives LIMIT 1")):
+        raise RuntimeError("message_archives is not empty; dropping it would lose the archived messages")
+    op.drop_index("ix_message_archives_ticket_id_last_created_at", table_name="message_archives")
+    op.drop_table("message_archives")
+    with op.batch_alter_table("ai_jobs") as batch:
+        batch.create_foreign_key("ai_jobs_message_id_fkey", "messages", ["message_id"], ["id"])
+    with op.batch_alter_table("messages") as batch:
+        batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+import uuid
+
+# Settings are read when the app is imported: point it at a throwaway SQLite
+# database and an offline AI provider before that happens
+_database_dir = tempfile.mkdtemp(prefix="support-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_database_dir}/test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+os.environ.setdefault("LLM_PROVIDERS", json.dumps([{"type": "mock", "latency": 0.01}]))
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_MESSAGES_BURST", "1000")
+
+import pytest
+from alembic import command
+from fastapi.testclient import TestClient
+
+from app.db.migrations import alembic_config
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    command.upgrade(alembic_config(), "head")
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def run(client):
+    """Run an async function on the app's event loop, where its engine lives."""
+    return client.portal.call
+
+
+def signup(client) -> dict:
+    response = client.post("/auth/signup", json={"email": f"{uuid.uuid4().hex}@example.com", "password": "pw"})
+    return {"Authorization": "Bearer " + response.json()["data"]["access_token"]}
+
+
+@pytest.fixture
+def auth(client) -> dict:
+    return signup(client)
+
+
+@pytest.fixture
+def other_auth(client) -> dict:
+    return signup(client)
+
+
+@pytest.fixture
+def ticket_id(client, auth) -> str:
+    response = client.post("/tickets/", json={"title": "Printer", "description": "It jams"}, headers=auth)
+    return response.json()["data"]["id"]
@@ -0,0 +1,139 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.db.models.ai_job import AIJob
+from app.db.models.message import Message
+from app.db.models.ticket import Ticket
+from app.db.session import SessionLocal
+from app.services import ai_jobs
+from app.services.ai_jobs import AIJobRequest, DatabaseAIJobQueue
+
+
+@pytest.fixture
+def job(client, auth, ticket_id, run) -> AIJobRequest:
+    """An unanswered user message, with no other job queued."""
+    client.post(f"/tickets/{ticket_id}/messages", params={"ai_mode": "stream"}, json={"content": "Help"}, headers=auth)
+
+    async def user_message():
+        async with SessionLocal() as db:
+            await db.execute(delete(AIJob))
+            await db.commit()
+            return await db.scalar(select(Message.id).filter(Message.ticket_id == uuid.UUID(ticket_id)))
+
+    return AIJobRequest(uuid.UUID(ticket_id), run(user_message))
+
+
+@pytest.fixture
+def start_queue(run):
+    queues = []
+
+    def start(**options) -> DatabaseAIJobQueue:
+        queue = DatabaseAIJobQueue(**{"workers": 2, "poll_interval": 0.05, "lease_seconds": 1, "max_attempts": 3, **options})
+        run(queue.start)
+        queues.append(queue)
+        return queue
+
+    yield start
+    for queue in queues:
+        run(queue.stop)
+
+
+def wait_for_jobs(run, count: int, timeout: float = 10) -> list:
+    """(status, attempts) of every job once `count` of them are finished."""
+    async def jobs():
+        async with SessionLocal() as db:
+            return [(job.status, job.attempts) for job in await db.scalars(select(AIJob).order_by(AIJob.created_at))]
+
+    deadline = time.monotonic() + timeout
+    while True:
+        result = run(jobs)
+        finished = [status for status, _ in result if status in ("completed", "failed")]
+        if len(finished) >= count or time.monotonic() > deadline:
+            return result
+        time.sleep(0.05)
+
+
+def replies(run, ticket_id: uuid.UUID) -> list:
+    async def contents():
+        async with SessionLocal() as db:
+            return (await db.scalars(select(Message.content).filter(
+                Message.ticket_id == ticket_id, Message.is_ai.is_(True)
+            ))).all()
+
+    return run(contents)
+
+
+def ai_status(run, ticket_id: uuid.UUID) -> str:
+    async def status():
+        async with SessionLocal() as db:
+            return await db.scalar(select(Ticket.ai_status).filter(Ticket.id == ticket_id))
+
+    return run(status)
+
+
+def test_lease_is_renewed_while_a_job_runs(run, job, start_queue, monkeypatch):
+    calls = []
+
+    async def slow_reply(conversation):
+        calls.append(conversation)
+        # Well past the lease: without renewal the idle worker would take over
+        await asyncio.sleep(2.5)
+        return "Slow reply"
+
+    monkeypatch.setattr(ai_jobs, "get_groq_response", slow_reply)
+    queue = start_queue()
+    run(queue.enqueue, job)
+
+    assert wait_for_jobs(run, 1) == [("completed", 1)]
+    assert len(calls) == 1
+    assert replies(run, job.ticket_id) == ["Slow reply"]
+    assert ai_status(run, job.ticket_id) == "completed"
+
+
+def test_duplicate_jobs_save_one_reply(run, job, start_queue, monkeypatch):
+    async def reply(conversation):
+        await asyncio.sleep(0.2)
+        return "Only once"
+
+    monkeypatch.setattr(ai_jobs, "get_groq_response", reply)
+    queue = start_queue()
+    run(queue.enqueue, job)
+    run(queue.enqueue, job)
+
+    assert wait_for_jobs(run, 2) == [("completed", 1), ("completed", 1)]
+    assert replies(run, job.ticket_id) == ["Only once"]
+
+
+def test_failed_job_is_retried(run, job, start_queue, monkeypatch):
+    calls = []
+
+    async def flaky_reply(conversation):
+        calls.append(conversation)
+        if len(calls) == 1:
+            raise RuntimeError("upstream hiccup")
+        return "Second time lucky"
+
+    monkeypatch.setattr(ai_jobs, "get_groq_response", flaky_reply)
+    queue = start_queue()
+    run(queue.enqueue, job)
+
+    assert wait_for_jobs(run, 1) == [("completed", 2)]
+    assert replies(run, job.ticket_id) == ["Second time lucky"]
+    assert ai_status(run, job.ticket_id) == "completed"
+
+
+def test_job_fails_after_max_attempts(run, job, start_queue, monkeypatch):
+    async def failing_reply(conversation):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(ai_jobs, "get_groq_response", failing_reply)
+    queue = start_queue(max_attempts=2)
+    run(queue.enqueue, job)
+
+    assert wait_for_jobs(run, 1) == [("failed", 2)]
+    assert replies(run, job.ticket_id) == []
+    assert ai_status(run, job.ticket_id) == "failed"
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.api.routes import messages
+from app.services.llm_router import LLMError
+
+
+def test_ai_response_conflicts_with_a_sync_reply_in_progress(client, auth, ticket_id, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    async def slow_reply(conversation):
+        started.set()
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return "Have you tried turning it off and on again?"
+
+    monkeypatch.setattr(messages, "get_groq_response", slow_reply)
+    with ThreadPoolExecutor(1) as pool:
+        posted = pool.submit(client.post, f"/tickets/{ticket_id}/messages", json={"content": "Help"}, headers=auth)
+        assert started.wait(5)
+        try:
+            assert client.get(f"/tickets/{ticket_id}/ai-response", headers=auth).status_code == 409
+        finally:
+            release.set()
+        assert posted.result().status_code == 201
+
+    # Once saved, the reply is replayed rather than generated again
+    response = client.get(f"/tickets/{ticket_id}/ai-response", headers=auth)
+    assert response.status_code == 200
+    assert "turning it off and on again" in response.text
+    assert ticket_id not in map(str, messages._replies_in_progress)
+
+
+def test_failed_sync_reply_releases_the_ticket(client, auth, ticket_id, monkeypatch):
+    async def failing_reply(conversation):
+        raise LLMError("no provider available")
+
+    monkeypatch.setattr(messages, "get_groq_response", failing_reply)
+    response = client.post(f"/tickets/{ticket_id}/messages", json={"content": "Help"}, headers=auth)
+    assert response.status_code == 503
+    assert not messages._replies_in_progress
+
+    # The unanswered message can still be answered by streaming
+    monkeypatch.undo()
+    response = client.get(f"/tickets/{ticket_id}/ai-response", headers=auth)
+    assert response.status_code == 200
+    assert "event: done" in response.text
+
+
+def test_ai_response_conflicts_with_a_stream_in_progress(client, auth, ticket_id, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    async def slow_stream(conversation):
+        started.set()
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        yield "Streamed reply"
+
+    monkeypatch.setattr(messages, "stream_groq_response", slow_stream)
+    client.post(f"/tickets/{ticket_id}/messages", params={"ai_mode": "stream"}, json={"content": "Help"}, headers=auth)
+    with ThreadPoolExecutor(1) as pool:
+        streamed = pool.submit(client.get, f"/tickets/{ticket_id}/ai-response", headers=auth)
+        assert started.wait(5)
+        try:
+            assert client.get(f"/tickets/{ticket_id}/ai-response", headers=auth).status_code == 409
+        finally:
+            release.set()
+        assert "Streamed reply" in streamed.result().text
+
+    items = client.get(f"/tickets/{ticket_id}/messages", headers=auth).json()["data"]["items"]
+    assert [(message["is_ai"], message["content"]) for message in items] == [(True, "Streamed reply"), (False, "Help")]
+
+
+def test_ai_response_defers_to_a_queued_job(client, auth, ticket_id, monkeypatch):
+    async def keep_queued(job):
+        pass
+
+    monkeypatch.setattr(messages.ai_job_queue, "enqueue", keep_queued)
+    response = client.post(
+        f"/tickets/{ticket_id}/messages", params={"ai_mode": "background"}, json={"content": "Help"}, headers=auth
+    )
+    assert response.status_code == 202
+
+    response = client.get(f"/tickets/{ticket_id}/ai-response", headers=auth)
+    assert response.status_code == 202
+    assert response.json()["data"] == {"ai_status": "queued"}
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight, StreamGroup
+from app.utils import cache
+from app.utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_cache_expires_entries(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=5)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2, ttl=20)
+
+    clock[0] += 10
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("b") == 2
+    assert (ttl_cache.hits, ttl_cache.misses) == (1, 1)
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    ttl_cache = TTLCache(maxsize=2, ttl=60)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+
+    assert ttl_cache.get("b") is None
+    assert (ttl_cache.get("a"), ttl_cache.get("c")) == (1, 3)
+    assert len(ttl_cache) == 2
+
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def load():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        group: SingleFlight[str] = SingleFlight()
+        results = await asyncio.gather(*(group.do("key", load) for _ in range(5)))
+        return results, len(group)
+
+    assert asyncio.run(main()) == (["value"] * 5, 0)
+    assert len(calls) == 1
+
+
+def test_single_flight_shares_failures_and_survives_cancelled_callers():
+    calls = []
+
+    async def load():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        group: SingleFlight[str] = SingleFlight()
+        cancelled = asyncio.ensure_future(group.do("key", load))
+        waiting = asyncio.ensure_future(group.do("key", load))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(RuntimeError):
+            await waiting
+        # The key is free again once the call finished
+        with pytest.raises(RuntimeError):
+            await group.do("key", load)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_stream_group_replays_missed_chunks_to_late_subscribers():
+    opened = []
+
+    async def chunks():
+        opened.append(None)
+        for chunk in ("a", "b", "c"):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def collect(stream):
+        return [chunk async for chunk in stream]
+
+    async def main():
+        group = StreamGroup()
+        first = asyncio.ensure_future(collect(group.subscribe("key", chunks)))
+        await asyncio.sleep(0.025)
+        late = await collect(group.subscribe("key", chunks))
+        first = await first
+        # The finished stream is forgotten once its pump task is done
+        await asyncio.sleep(0)
+        return first, late, len(group)
+
+    assert asyncio.run(main()) == (["a", "b", "c"], ["a", "b", "c"], 0)
+    assert len(opened) == 1
+
+
+def test_ticket_is_served_from_the_cache_with_etags(client, auth, other_auth, ticket_id):
+    response = client.get(f"/tickets/{ticket_id}", headers=auth)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+
+    response = client.get(f"/tickets/{ticket_id}", headers={**auth, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Ownership is checked against the cached ticket too
+    assert client.get(f"/tickets/{ticket_id}", headers=other_auth).status_code == 404
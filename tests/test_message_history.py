@@ -0,0 +1,96 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.db.models.message import Message
+from app.db.models.ticket import Ticket, TICKET_RESOLVED
+from app.db.session import SessionLocal
+from app.services.archiver import ARCHIVE_JSON_GZIP, MessageArchiver, message_archiver
+from app.services.ticket_cache import ticket_cache
+from app.utils.pagination import encode_cursor
+
+ARCHIVE_AFTER_DAYS = 30
+
+
+@pytest.fixture
+def conversation(client, auth, ticket_id, run, monkeypatch) -> list:
+    """
+    A resolved ticket with twelve messages, the first nine (two of them
+    created at the same time) old enough to be archived.
+    """
+    contents = [f"message {i}" for i in range(12)]
+    for content in contents:
+        client.post(f"/tickets/{ticket_id}/messages", params={"ai_mode": "stream"}, json={"content": content}, headers=auth)
+
+    async def age():
+        async with SessionLocal() as db:
+            rows = (await db.scalars(select(Message).filter(
+                Message.ticket_id == uuid.UUID(ticket_id)
+            ).order_by(Message.created_at))).all()
+            for i, message in enumerate(rows[:9]):
+                message.created_at = datetime.utcnow() - timedelta(days=60 - i)
+            rows[8].created_at = rows[7].created_at
+            await db.execute(update(Ticket).filter(Ticket.id == uuid.UUID(ticket_id)).values(
+                status=TICKET_RESOLVED, created_at=datetime.utcnow() - timedelta(days=90)
+            ))
+            await db.commit()
+        await ticket_cache.invalidate(uuid.UUID(ticket_id))
+
+    run(age)
+    monkeypatch.setattr(message_archiver, "after_days", ARCHIVE_AFTER_DAYS)
+    return contents
+
+
+def history(client, auth, ticket_id) -> list:
+    """Every message newest first, paging back with `before`."""
+    contents, cursor = [], None
+    while True:
+        params = {"limit": 4, **({"before": cursor} if cursor else {})}
+        page = client.get(f"/tickets/{ticket_id}/messages", params=params, headers=auth).json()["data"]
+        contents += [message["content"] for message in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return contents
+
+
+def poll(client, auth, ticket_id) -> list:
+    """Every message oldest first, polling with `since` from the start."""
+    contents, cursor = [], encode_cursor(datetime(1970, 1, 1), uuid.UUID(int=0))
+    while True:
+        params = {"limit": 3, "since": cursor}
+        page = client.get(f"/tickets/{ticket_id}/messages", params=params, headers=auth).json()["data"]
+        if not page["items"]:
+            return contents
+        contents += [message["content"] for message in page["items"]]
+        cursor = page["next_cursor"]
+
+
+def remaining(run, ticket_id) -> int:
+    async def count():
+        async with SessionLocal() as db:
+            return await db.scalar(select(func.count()).select_from(Message).filter(
+                Message.ticket_id == uuid.UUID(ticket_id)
+            ))
+
+    return run(count)
+
+
+def test_archived_messages_stay_in_the_history(client, auth, ticket_id, run, conversation):
+    before = history(client, auth, ticket_id)
+    assert sorted(before) == sorted(conversation)
+
+    archiver = MessageArchiver(ARCHIVE_AFTER_DAYS, 1, 10, ARCHIVE_JSON_GZIP, 0, 3)
+    assert run(archiver.archive_ticket, uuid.UUID(ticket_id), archiver.cutoff()) == 9
+    assert remaining(run, ticket_id) == 3
+
+    assert history(client, auth, ticket_id) == before
+    assert poll(client, auth, ticket_id) == before[::-1]
+
+
+def test_history_pages_without_archival(client, auth, ticket_id, conversation, monkeypatch):
+    monkeypatch.setattr(message_archiver, "after_days", 0)
+    before = history(client, auth, ticket_id)
+    assert sorted(before) == sorted(conversation)
+    assert poll(client, auth, ticket_id) == before[::-1]